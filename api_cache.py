@@ -5,18 +5,211 @@ This module provides caching for API responses to improve performance
 by reducing database load for frequently accessed data.
 """
 
+import os
 import logging
-import json
 import time
 import hashlib
 import functools
-from flask import request, current_app
+import threading
+from collections import deque, namedtuple
+from cachetools import TTLCache
+from flask import request, current_app, g
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# In-memory cache store - for production, use Redis or another distributed cache
-_cache = {}
+# Hash backend for cache keys ('xxhash' or 'blake2b'). Keys are never used in a
+# security context, so a fast non-cryptographic 128-bit hash is sufficient.
+CACHE_KEY_HASHER = 'xxhash' if xxhash is not None else 'blake2b'
+
+def _new_hasher():
+    """Return a fresh incremental 128-bit hasher for the configured backend."""
+    if CACHE_KEY_HASHER == 'xxhash':
+        return xxhash.xxh128()
+    return hashlib.blake2b(digest_size=16)
+
+def _request_key_prefix():
+    """
+    Get the digest of the request data that affects cache keys.
+    
+    The digest is computed once per request and stored on flask.g so that
+    every cached endpoint touched during the request can reuse it.
+    
+    Returns:
+        bytes: Request digest, or b'' outside a request context
+    """
+    if not request:
+        return b''
+    
+    prefix = getattr(g, '_api_cache_req_prefix', None)
+    if prefix is None:
+        h = _new_hasher()
+        h.update(request.path.encode('utf-8'))
+        h.update(b'\0')
+        h.update(request.query_string)
+        
+        # Only include request headers that affect caching
+        for header in ('Accept', 'Accept-Language'):
+            h.update(b'\0')
+            h.update(request.headers.get(header, '').encode('utf-8'))
+        
+        prefix = h.digest()
+        g._api_cache_req_prefix = prefix
+    
+    return prefix
+
+# Upper bounds for the in-memory cache. Entries may use a shorter TTL than
+# API_CACHE_MAX_TTL; the per-entry expiry is checked on read.
+CACHE_MAX_ENTRIES = int(os.getenv('API_CACHE_MAX', 10000))
+CACHE_MAX_TTL = int(os.getenv('API_CACHE_MAX_TTL', 3600))
+CACHE_MAX_BODY_BYTES = int(os.getenv('API_CACHE_MAX_BODY_BYTES', 256 * 1024))
+
+# Bodies larger than this are stored zstd-compressed (when zstandard is
+# installed); JSON typically shrinks 5-10x at level 3
+COMPRESS_MIN_BYTES = int(os.getenv('API_CACHE_COMPRESS_MIN_BYTES', 4096))
+COMPRESS_LEVEL = 3
+
+# zstd (de)compressor objects must not be shared between threads
+_zstd_local = threading.local()
+
+def _compress(body):
+    """Compress a body with this thread's zstd compressor."""
+    compressor = getattr(_zstd_local, 'compressor', None)
+    if compressor is None:
+        compressor = _zstd_local.compressor = zstandard.ZstdCompressor(level=COMPRESS_LEVEL)
+    return compressor.compress(body)
+
+def _decompress(body):
+    """Decompress a body with this thread's zstd decompressor."""
+    decompressor = getattr(_zstd_local, 'decompressor', None)
+    if decompressor is None:
+        decompressor = _zstd_local.decompressor = zstandard.ZstdDecompressor()
+    return decompressor.decompress(body)
+
+class _Entry:
+    """A cached response. Slots keep entries small; instances are recycled."""
+    __slots__ = ('body', 'compressed', 'content_type', 'status', 'expiry', 'created_at')
+
+# Snapshot of a cache entry handed out to callers, so the entry itself can be
+# recycled as soon as it leaves the cache
+CachedResponse = namedtuple('CachedResponse', ['body', 'content_type', 'status'])
+
+# Free list of evicted entries, reused by set_cached_data
+ENTRY_POOL_SIZE = 1024
+_entry_pool = deque(maxlen=ENTRY_POOL_SIZE)
+
+def _release_entry(entry):
+    """Return an evicted entry to the free list. Call with its shard lock held."""
+    if entry is not None:
+        entry.body = None
+        _entry_pool.append(entry)
+
+# Number of independently locked cache shards (must be a power of two)
+CACHE_SHARD_COUNT = 16
+
+def _new_shards():
+    """Create empty cache shards, each a (lock, TTLCache) pair."""
+    shard_size = max(1, CACHE_MAX_ENTRIES // CACHE_SHARD_COUNT)
+    return [(threading.Lock(), TTLCache(maxsize=shard_size, ttl=CACHE_MAX_TTL))
+            for _ in range(CACHE_SHARD_COUNT)]
+
+def _now():
+    """
+    Get the monotonic clock time used for cache expiry.
+    
+    Monotonic time keeps TTLs correct across wall-clock jumps. Within a
+    request the value is read once and stored on flask.g, so every cache
+    lookup in that request reuses it.
+    """
+    if not request:
+        return time.monotonic()
+    
+    now = getattr(g, '_api_cache_now', None)
+    if now is None:
+        now = time.monotonic()
+        g._api_cache_now = now
+    
+    return now
+
+# In-memory cache store - for production, use Redis or another distributed cache.
+# Keys are spread over shards so threads working on different keys rarely
+# contend for the same lock.
+_cache_shards = _new_shards()
+
+# Keys stored under each namespace, so a namespace can be cleared without
+# scanning the whole cache (keys are digests and don't encode the namespace)
+_ns_index = {}
+_ns_lock = threading.Lock()
+
+# Background janitor that evicts expired entries even when nobody reads them
+_janitor_thread = None
+_janitor_stop = threading.Event()
+
+def _shard_for(key):
+    """Return the (lock, cache) shard that holds key."""
+    return _cache_shards[hash(key) & (CACHE_SHARD_COUNT - 1)]
+
+def _contains(key):
+    """Check whether key is currently stored, without touching its entry."""
+    lock, cache = _shard_for(key)
+    with lock:
+        return key in cache
+
+def _namespace_hasher(namespace):
+    """
+    Build a hasher already fed with the namespace.
+    
+    Copying this template is cheaper than hashing the namespace again, so
+    decorated functions build it once and reuse it for every call.
+    """
+    h = _new_hasher()
+    h.update(namespace.encode('utf-8'))
+    h.update(b'\0')
+    return h
+
+def cache_key_from_base(base, args, kwargs):
+    """
+    Generate a cache key from a namespace template hasher.
+    
+    Args:
+        base: Hasher returned by _namespace_hasher (left unmodified)
+        args: Positional arguments
+        kwargs: Keyword arguments
+        
+    Returns:
+        str: Cache key
+    """
+    # Feed everything that affects the cache key straight into the hasher,
+    # in a stable order, instead of building an intermediate JSON string
+    h = base.copy()
+    h.update(b'%d' % len(args))
+    for arg in args:
+        h.update(b'\0')
+        h.update(repr(arg).encode('utf-8'))
+    for name, value in sorted(kwargs.items()):
+        h.update(b'\0')
+        h.update(repr((name, value)).encode('utf-8'))
+    
+    # Add the request data (path, query string, headers) for this request
+    h.update(b'\0')
+    h.update(_request_key_prefix())
+    
+    return h.hexdigest()
 
 def cache_key(namespace, *args, **kwargs):
     """
@@ -30,26 +223,7 @@ def cache_key(namespace, *args, **kwargs):
     Returns:
         str: Cache key
     """
-    # Create a dictionary of all data that affects the cache key
-    key_data = {
-        'namespace': namespace,
-        'args': args,
-        'kwargs': kwargs
-    }
-    
-    # If in a Flask request context, add relevant request data
-    if request:
-        key_data['path'] = request.path
-        key_data['query_string'] = request.query_string.decode('utf-8')
-        
-        # Only include request headers that affect caching
-        headers_to_include = ['Accept', 'Accept-Language']
-        key_data['headers'] = {k: v for k, v in request.headers.items() 
-                              if k in headers_to_include}
-    
-    # Convert to a JSON string and hash it
-    key_str = json.dumps(key_data, sort_keys=True)
-    return hashlib.md5(key_str.encode('utf-8')).hexdigest()
+    return cache_key_from_base(_namespace_hasher(namespace), args, kwargs)
 
 def get_cached_data(key):
     """
@@ -59,42 +233,76 @@ def get_cached_data(key):
         key: Cache key
         
     Returns:
-        Cached data or None if not found or expired
+        CachedResponse: Body, content type and status, or None if not found
+        or expired
     """
-    global _cache
+    lock, cache = _shard_for(key)
     
-    cache_entry = _cache.get(key)
-    if not cache_entry:
-        return None
+    with lock:
+        cache_entry = cache.get(key)
+        if cache_entry is None:
+            return None
+        
+        # Check if entry has expired (TTLCache only enforces the maximum TTL)
+        if cache_entry.expiry < _now():
+            # Remove expired entry
+            _release_entry(cache.pop(key, None))
+            return None
+        
+        body = cache_entry.body
+        compressed = cache_entry.compressed
+        cached = CachedResponse(body, cache_entry.content_type, cache_entry.status)
     
-    # Check if entry has expired
-    if 'expiry' in cache_entry and cache_entry['expiry'] < time.time():
-        # Remove expired entry
-        del _cache[key]
-        return None
+    # Decompress outside the shard lock
+    if compressed:
+        cached = cached._replace(body=_decompress(body))
     
     logger.debug(f"Cache hit for key: {key}")
-    return cache_entry['data']
+    return cached
 
-def set_cached_data(key, data, ttl=300):
+def set_cached_data(key, body, ttl=300, content_type='application/json', status=200,
+                    namespace=None):
     """
-    Store data in cache with expiration time.
+    Store a serialized response body in cache with expiration time.
     
     Args:
         key: Cache key
-        data: Data to cache
+        body: Serialized response body (bytes)
         ttl: Time to live in seconds (default: 5 minutes)
+        content_type: Content type of the body
+        status: HTTP status code of the response
+        namespace: Namespace the key belongs to, used by clear_cache
     """
-    global _cache
-    
     # Calculate expiry time
-    expiry = time.time() + ttl
+    now = _now()
+    expiry = now + min(ttl, CACHE_MAX_TTL)
+    
+    compressed = zstandard is not None and len(body) > COMPRESS_MIN_BYTES
+    if compressed:
+        body = _compress(body)
+    
+    try:
+        entry = _entry_pool.pop()
+    except IndexError:
+        entry = _Entry()
+    
+    entry.body = body
+    entry.compressed = compressed
+    entry.content_type = content_type
+    entry.status = status
+    entry.expiry = expiry
+    entry.created_at = now
+    
+    lock, cache = _shard_for(key)
+    
+    with lock:
+        _release_entry(cache.pop(key, None))
+        cache[key] = entry
+    
+    if namespace is not None:
+        with _ns_lock:
+            _ns_index.setdefault(namespace, set()).add(key)
     
-    _cache[key] = {
-        'data': data,
-        'expiry': expiry,
-        'created_at': time.time()
-    }
     logger.debug(f"Cached data with key: {key}, TTL: {ttl}s")
 
 def clear_cache(namespace=None):
@@ -104,30 +312,89 @@ def clear_cache(namespace=None):
     Args:
         namespace: Namespace to clear (if None, clear all)
     """
-    global _cache
-    
     if namespace is None:
-        _cache = {}
+        for lock, cache in _cache_shards:
+            with lock:
+                cache.clear()
+        with _ns_lock:
+            _ns_index.clear()
         logger.info("Cleared entire cache")
     else:
-        # Find keys that start with the namespace
-        keys_to_delete = [k for k in _cache.keys() if k.startswith(namespace)]
+        # Drop exactly the keys recorded for the namespace
+        with _ns_lock:
+            keys_to_delete = _ns_index.pop(namespace, set())
+        
         for key in keys_to_delete:
-            del _cache[key]
+            lock, cache = _shard_for(key)
+            with lock:
+                _release_entry(cache.pop(key, None))
         logger.info(f"Cleared {len(keys_to_delete)} entries from namespace: {namespace}")
 
-def api_cache(ttl=300, namespace=None):
+def make_cached_response(cached):
+    """
+    Build a response that sends a cached body as-is.
+    
+    Args:
+        cached: CachedResponse returned by get_cached_data
+        
+    Returns:
+        Response object
+    """
+    return current_app.response_class(
+        cached.body,
+        status=cached.status,
+        content_type=cached.content_type
+    )
+
+# orjson options matching Flask's JSON provider: sorted keys, and dates and
+# dataclasses handed to the provider's default() (dates become HTTP dates,
+# as with jsonify) instead of orjson's own ISO format
+_ORJSON_OPTIONS = (
+    orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None else 0
+)
+
+def _make_response(result):
+    """
+    Convert a view return value into a response object.
+    
+    Plain dicts and lists are serialized with orjson when it is available,
+    which is considerably faster than Flask's jsonify. Types orjson can't
+    encode go through the app's JSON provider's default(), so cached and
+    uncached responses come out in the same format.
+    """
+    default = getattr(current_app.json, 'default', None)
+    if orjson is not None and default is not None and isinstance(result, (dict, list)):
+        try:
+            body = orjson.dumps(result, default=default, option=_ORJSON_OPTIONS)
+            return current_app.response_class(body, mimetype='application/json')
+        except TypeError:
+            # Anything else (e.g. non-string keys) goes through Flask's encoder
+            pass
+    
+    return current_app.make_response(result)
+
+def api_cache(ttl=300, namespace=None, max_bytes=None):
     """
     Decorator for caching API responses.
     
+    Streamed responses and responses larger than max_bytes are passed
+    through without being cached.
+    
     Args:
         ttl: Time to live in seconds (default: 5 minutes)
         namespace: Custom namespace (default: function name)
+        max_bytes: Largest body to cache (default: CACHE_MAX_BODY_BYTES)
         
     Returns:
         Decorated function
     """
     def decorator(f):
+        # The namespace is fixed per function, so hash it only once
+        func_namespace = namespace or f.__name__
+        base_hasher = _namespace_hasher(func_namespace)
+        body_limit = CACHE_MAX_BODY_BYTES if max_bytes is None else max_bytes
+        
         @functools.wraps(f)
         def decorated_function(*args, **kwargs):
             # Skip caching for non-GET requests
@@ -135,43 +402,114 @@ def api_cache(ttl=300, namespace=None):
                 return f(*args, **kwargs)
             
             # Generate cache key
-            func_namespace = namespace or f.__name__
-            key = cache_key(func_namespace, *args, **kwargs)
+            key = cache_key_from_base(base_hasher, args, kwargs)
+            
+            # Try to get from cache and send the stored bytes as-is
+            cached = get_cached_data(key)
+            if cached is not None:
+                return make_cached_response(cached)
+            
+            # Execute function and cache the serialized result
+            response = _make_response(f(*args, **kwargs))
             
-            # Try to get from cache
-            cached_data = get_cached_data(key)
-            if cached_data is not None:
-                return cached_data
+            # Reading a streamed body would exhaust its generator, and large
+            # bodies would pin too much memory
+            if response.is_streamed:
+                return response
             
-            # Execute function and cache the result
-            result = f(*args, **kwargs)
-            set_cached_data(key, result, ttl)
-            return result
+            content_length = response.calculate_content_length()
+            if content_length is None or content_length > body_limit:
+                return response
+            
+            set_cached_data(key, response.get_data(), ttl,
+                            content_type=response.content_type,
+                            status=response.status_code,
+                            namespace=func_namespace)
+            return response
         
         return decorated_function
     
     return decorator
 
 # Cache maintenance functions
-def init_cache():
-    """Initialize the cache system."""
-    global _cache
-    _cache = {}
+def init_cache(cleanup_interval=75):
+    """
+    Initialize the cache system and start the expiry janitor thread.
+    
+    Args:
+        cleanup_interval: Seconds between expiry sweeps (default: a quarter
+            of the default 5 minute TTL)
+    """
+    global _cache_shards, _janitor_thread
+    _cache_shards = _new_shards()
+    with _ns_lock:
+        _ns_index.clear()
+    
+    if _janitor_thread is None or not _janitor_thread.is_alive():
+        _janitor_stop.clear()
+        _janitor_thread = threading.Thread(
+            target=_janitor,
+            args=(cleanup_interval,),
+            name="api-cache-janitor",
+            daemon=True
+        )
+        _janitor_thread.start()
+    
     logger.info("Cache system initialized")
 
+def _janitor(interval):
+    """Periodically remove expired entries until stop_cache_janitor is called."""
+    while not _janitor_stop.wait(interval):
+        try:
+            cleanup_expired()
+        except Exception as e:
+            logger.error(f"Error cleaning up cache: {str(e)}")
+
+def stop_cache_janitor(timeout=None):
+    """
+    Stop the expiry janitor thread.
+    
+    Args:
+        timeout: Seconds to wait for the thread to exit (default: wait forever)
+    """
+    global _janitor_thread
+    
+    _janitor_stop.set()
+    if _janitor_thread is not None:
+        _janitor_thread.join(timeout)
+        _janitor_thread = None
+
 def cleanup_expired():
-    """Remove expired items from cache."""
-    global _cache
+    """Remove expired items from cache, one shard at a time."""
+    removed = 0
     
-    now = time.time()
-    expired_keys = [k for k, v in _cache.items() 
-                   if 'expiry' in v and v['expiry'] < now]
+    for lock, cache in _cache_shards:
+        now = time.monotonic()
+        
+        with lock:
+            # Drop entries past the maximum TTL, then those with a shorter TTL
+            cache.expire()
+            expired_keys = [k for k, v in cache.items() if v.expiry < now]
+            
+            for key in expired_keys:
+                _release_entry(cache.pop(key, None))
+        
+        removed += len(expired_keys)
+        
+        # Let request threads run between shards
+        time.sleep(0)
     
-    for key in expired_keys:
-        del _cache[key]
+    # Forget index entries for keys that expired or were evicted
+    with _ns_lock:
+        for namespace, keys in list(_ns_index.items()):
+            live_keys = {k for k in keys if _contains(k)}
+            if live_keys:
+                _ns_index[namespace] = live_keys
+            else:
+                del _ns_index[namespace]
     
-    if expired_keys:
-        logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
+    if removed:
+        logger.info(f"Cleaned up {removed} expired cache entries")
 
 def get_cache_stats():
     """
@@ -180,25 +518,26 @@ def get_cache_stats():
     Returns:
         dict: Cache statistics
     """
-    global _cache
-    
-    total_entries = len(_cache)
-    now = time.time()
-    expired_entries = sum(1 for v in _cache.values() 
-                         if 'expiry' in v and v['expiry'] < now)
-    
-    # Calculate size estimate
+    total_entries = 0
+    expired_entries = 0
     total_size = 0
-    for entry in _cache.values():
-        if 'data' in entry:
-            # Rough size estimation
-            data_str = json.dumps(entry['data'])
-            total_size += len(data_str)
+    now = time.monotonic()
+    
+    for lock, cache in _cache_shards:
+        with lock:
+            for entry in cache.values():
+                total_entries += 1
+                if entry.expiry < now:
+                    expired_entries += 1
+                # Bodies are stored serialized (and possibly compressed),
+                # so their length is the memory they take
+                total_size += len(entry.body)
     
     return {
         'total_entries': total_entries,
         'expired_entries': expired_entries,
         'active_entries': total_entries - expired_entries,
         'total_size_bytes': total_size,
-        'total_size_kb': total_size / 1024
+        'total_size_kb': total_size / 1024,
+        'max_entries': CACHE_MAX_ENTRIES
     }
\ No newline at end of file
@@ -7,11 +7,77 @@ with various retailers and stores.
 
 import logging
 from datetime import datetime
-from flask import jsonify, request
-from psycopg2.extras import RealDictCursor
+from flask import jsonify, request, current_app
+from psycopg2.extras import execute_values
+
+from glassrain_production.task_processor import background_task
 
 logger = logging.getLogger(__name__)
 
+@background_task(name="track_checkout", description="Persist a retailer checkout and its items")
+def _persist_checkout(payload):
+    """
+    Write a checkout record and its items to the database.
+    
+    Args:
+        payload: Validated checkout data from the tracking endpoint
+    
+    Returns:
+        dict: The ID of the stored checkout
+    """
+    get_db_connection = current_app.config.get('get_db_connection')
+    if not get_db_connection:
+        raise RuntimeError("Database connection function not available")
+    
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    
+    try:
+        # Record the checkout transaction
+        cursor = conn.cursor()
+        
+        # Insert checkout record
+        cursor.execute("""
+            INSERT INTO checkout_tracking
+            (user_id, store_id, session_id, total_amount, checkout_date)
+            VALUES (%s, %s, %s, %s, %s)
+            RETURNING checkout_id
+        """, (payload['user_id'], payload['store_id'], payload['session_id'],
+              payload['total_amount'], payload['checkout_date']))
+        
+        checkout_id = cursor.fetchone()[0]
+        
+        # Insert individual items in a single round trip
+        rows = [
+            (
+                checkout_id,
+                item.get('product_id'),
+                item.get('name', ''),
+                item.get('quantity', 1),
+                item.get('price', 0)
+            )
+            for item in payload['items']
+        ]
+        
+        execute_values(cursor, """
+            INSERT INTO checkout_items
+            (checkout_id, product_id, product_name, quantity, price)
+            VALUES %s
+        """, rows, page_size=200)
+        
+        conn.commit()
+        cursor.close()
+        
+        return {"checkout_id": checkout_id}
+    
+    except Exception as e:
+        logger.error(f"Error tracking checkout: {str(e)}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
 def add_retailer_checkout_endpoint(app):
     """Register the checkout tracking endpoint with the Flask app"""
     
@@ -21,7 +87,7 @@ def add_retailer_checkout_endpoint(app):
         # Get JSON data from request
         if not request.json:
             return jsonify({"error": "No JSON data provided"}), 400
-            
+        
         # Extract data from request
         data = request.json
         user_id = data.get('user_id')
@@ -33,66 +99,28 @@ def add_retailer_checkout_endpoint(app):
         # Validate required fields
         if not store_id:
             return jsonify({"error": "store_id is required"}), 400
-            
+        
         if not items:
             return jsonify({"error": "items array is required"}), 400
-            
-        # Get database connection using the app's connection function
-        get_db_connection = app.config.get('get_db_connection')
-        if not get_db_connection:
-            logger.error("Database connection function not available")
-            return jsonify({"error": "Internal server error"}), 500
-            
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({"error": "Database connection failed"}), 500
-            
-        try:
-            # Record the checkout transaction
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Insert checkout record
-            cursor.execute("""
-                INSERT INTO checkout_tracking 
-                (user_id, store_id, session_id, total_amount, checkout_date)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING checkout_id
-            """, (user_id, store_id, session_id, total_amount, datetime.now()))
-            
-            result = cursor.fetchone()
-            checkout_id = result['checkout_id']
-            
-            # Insert individual items
-            for item in items:
-                product_id = item.get('product_id')
-                product_name = item.get('name', '')
-                quantity = item.get('quantity', 1)
-                price = item.get('price', 0)
-                
-                cursor.execute("""
-                    INSERT INTO checkout_items
-                    (checkout_id, product_id, product_name, quantity, price)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (checkout_id, product_id, product_name, quantity, price))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            return jsonify({
-                "status": "success",
-                "checkout_id": checkout_id,
-                "message": "Checkout successfully tracked"
-            })
-            
-        except Exception as e:
-            logger.error(f"Error tracking checkout: {str(e)}")
-            if conn:
-                conn.rollback()
-                conn.close()
-            return jsonify({"error": str(e)}), 500
+        
+        # Persist in the background; clients poll /api/tasks/<task_id>
+        # for the resulting checkout_id
+        task = _persist_checkout.submit({
+            "user_id": user_id,
+            "store_id": store_id,
+            "session_id": session_id,
+            "items": items,
+            "total_amount": total_amount,
+            "checkout_date": datetime.now()
+        })
+        
+        return jsonify({
+            "status": "accepted",
+            "task_id": task.task_id,
+            "message": "Checkout tracking started"
+        }), 202
     
     # Register the database connection function with the app
     # Make the database connection function available to the route
     from glassrain_unified import get_db_connection
-    app.config['get_db_connection'] = get_db_connection
\ No newline at end of file
+    app.config['get_db_connection'] = get_db_connection
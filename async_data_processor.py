@@ -10,20 +10,58 @@ import time
 import json
 import os
 import traceback
+import threading
+from functools import partial
 from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
 import sys
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Ensure correct paths for imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
-from glassrain_production.task_processor import background_task, task_progress
-from glassrain_production.db_pool import execute_query, execute_modify
+from glassrain_production.task_processor import (
+    background_task, task_progress, add_task_done_callback, TaskStatus
+)
+from glassrain_production.db_pool import execute_query, execute_modify, iter_query
+from glassrain_production.api_cache import get_cached_data, set_cached_data, make_cached_response
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# How long finished analyses and "address not found" results are cached
+PROPERTY_INSIGHTS_TTL = 3600
+PROPERTY_NOT_FOUND_TTL = 60
+
+# Property analyses currently running, keyed by (address_id, user_id), so
+# concurrent requests for the same address share one task. The user is part
+# of the key because the task is recorded as that user's; the finished
+# result only depends on the address and is cached per address.
+_inflight_analyses = {}
+_inflight_lock = threading.Lock()
+
+class AddressNotFoundError(ValueError):
+    """Raised when a property analysis is requested for an unknown address"""
+    pass
+
+def _dumps(data):
+    """Serialize data to JSON bytes."""
+    if orjson:
+        return orjson.dumps(data)
+    return json.dumps(data).encode('utf-8')
+
+def _insights_cache_key(address_id):
+    """Cache key for the analysis result of an address."""
+    return f"property_insights:{address_id}"
+
 @background_task(name="property_analysis", description="Analyze property data and extract insights")
 def analyze_property(address_id, user_id=None):
     """
@@ -42,21 +80,9 @@ def analyze_property(address_id, user_id=None):
     task_progress(analyze_property.current_task.task_id, 10, "Starting property analysis")
     
     try:
-        # Get address details
-        address_query = """
-            SELECT * FROM addresses WHERE id = %s
-        """
-        address_data = execute_query(address_query, (address_id,))
-        
-        if not address_data or len(address_data) == 0:
-            raise ValueError(f"Address not found: {address_id}")
-        
-        address = address_data[0]
-        full_address = f"{address['street']}, {address['city']}, {address['state']} {address['zip']}"
-        
         # Update progress to 20%
         task_progress(analyze_property.current_task.task_id, 20, 
-                     f"Retrieved address information for {full_address}")
+                     f"Analyzing property for address_id={address_id}")
         
         # Simulate property analysis (in a real implementation, this would call ML models, etc.)
         time.sleep(2)  # Simulating time-intensive analysis
@@ -67,7 +93,7 @@ def analyze_property(address_id, user_id=None):
         # Generate property insights
         insights = {
             "address_id": address_id,
-            "full_address": full_address,
+            "full_address": None,  # Filled in from the address row when stored
             "analysis_date": datetime.now().isoformat(),
             "property_insights": {
                 "estimated_size": "2,400 sq ft",  # This would be calculated in a real implementation
@@ -87,30 +113,46 @@ def analyze_property(address_id, user_id=None):
         # Update progress to 80%
         task_progress(analyze_property.current_task.task_id, 80, "Generating recommendations")
         
-        # Store insights in database
+        # Read the address and store the insights in one round trip. Nothing
+        # is inserted (and no row returned) if the address doesn't exist.
+        # concat_ws skips missing parts instead of nulling the whole address.
         store_query = """
+            WITH addr AS (
+                SELECT concat_ws(', ', street, city, concat_ws(' ', state, zip)) AS full_address
+                FROM addresses
+                WHERE id = %(address_id)s
+            )
             INSERT INTO property_insights 
             (address_id, analysis_date, insights_data, user_id) 
-            VALUES (%s, %s, %s, %s)
+            SELECT %(address_id)s, %(analysis_date)s,
+                   jsonb_set(%(insights)s::jsonb, '{full_address}', to_jsonb(addr.full_address)),
+                   %(user_id)s
+            FROM addr
             ON CONFLICT (address_id) 
             DO UPDATE SET 
                 analysis_date = EXCLUDED.analysis_date,
                 insights_data = EXCLUDED.insights_data
-            RETURNING id
+            RETURNING id, insights_data->>'full_address' AS full_address
         """
         
         result = execute_query(
             store_query, 
-            (
-                address_id, 
-                datetime.now(), 
-                json.dumps(insights), 
-                user_id
-            )
+            {
+                "address_id": address_id,
+                "analysis_date": datetime.now(),
+                "insights": _dumps(insights).decode('utf-8'),
+                "user_id": user_id
+            }
         )
         
+        if result is None:
+            # A database error, not a missing address: fail the task so the
+            # result isn't cached as a successful analysis
+            raise RuntimeError(f"Failed to store property insights for address_id={address_id}")
         if not result:
-            logger.warning(f"Failed to store property insights for address_id={address_id}")
+            raise AddressNotFoundError(f"Address not found: {address_id}")
+        
+        insights["full_address"] = result[0]['full_address']
         
         # Update progress to 100%
         task_progress(analyze_property.current_task.task_id, 100, "Analysis complete")
@@ -163,78 +205,85 @@ def check_seasonal_services():
         task_progress(check_seasonal_services.current_task.task_id, 40, 
                      f"Found {len(seasonal_services)} seasonal services")
         
-        # Filter services by current season
-        current_season_services = []
-        
-        for service in seasonal_services:
-            start_month = service.get('start_month')
-            end_month = service.get('end_month')
-            
-            # If start_month is None, use a default value of 1
-            if start_month is None:
-                start_month = 1
-                
-            # If end_month is None, use a default value of 12
-            if end_month is None:
-                end_month = 12
-                
-            # Check if current month is within service season
-            if start_month <= end_month:
-                # Normal season (e.g., Apr-Aug)
-                if start_month <= current_month <= end_month:
-                    current_season_services.append(service)
-            else:
-                # Season spans year boundary (e.g., Nov-Feb)
-                if current_month >= start_month or current_month <= end_month:
-                    current_season_services.append(service)
+        # Filter services by current season. Missing start/end months default
+        # to January/December; seasons with start > end span the year boundary
+        # (e.g., Nov-Feb).
+        starts = np.fromiter((s.get('start_month') or 1 for s in seasonal_services),
+                             dtype=np.int8, count=len(seasonal_services))
+        ends = np.fromiter((s.get('end_month') or 12 for s in seasonal_services),
+                           dtype=np.int8, count=len(seasonal_services))
+        in_season = np.where(
+            starts <= ends,
+            (current_month >= starts) & (current_month <= ends),
+            (current_month >= starts) | (current_month <= ends)
+        )
+        current_season_services = [seasonal_services[i] for i in np.flatnonzero(in_season)]
         
         # Update progress to 60%
         task_progress(check_seasonal_services.current_task.task_id, 60, 
                      f"Filtered to {len(current_season_services)} current season services")
         
-        # Get all addresses
-        addresses_query = "SELECT * FROM addresses"
-        addresses = execute_query(addresses_query)
-        
-        if not addresses:
-            return {"error": "No addresses found"}
+        # Service details are the same for every address, so build them once
+        recommended_date = (now + timedelta(days=14)).isoformat()
+        
+        # In a real implementation, we would check service history to see if a
+        # service was already performed recently at each address
+        services_by_id = {
+            service['id']: {
+                "service_id": service['id'],
+                "service_name": service['name'],
+                "category_name": service['category_name'],
+                "description": service['description'],
+                "is_urgent": service.get('is_urgent', False),
+                "recommended_date": recommended_date
+            }
+            for service in current_season_services
+        }
         
         # Update progress to 80%
         task_progress(check_seasonal_services.current_task.task_id, 80, 
-                     f"Checking {len(addresses)} properties for seasonal services")
+                     "Checking properties for seasonal services")
+        
+        # Let Postgres pair every address with the in-season services. The
+        # LEFT JOIN keeps addresses with nothing due (service_id is NULL) so
+        # they are still counted.
+        address_services_query = """
+            SELECT a.id AS address_id, a.street, a.city, a.state, a.zip,
+                   s.id AS service_id
+            FROM addresses a
+            LEFT JOIN services s ON s.id = ANY(%s)
+            ORDER BY a.id, s.id
+        """
+        rows = iter_query(address_services_query, (list(services_by_id),))
         
         # Build recommendations for each address
         recommendations = []
+        total_addresses = 0
         
-        for address in addresses:
-            address_services = []
-            
-            for service in current_season_services:
-                # In a real implementation, we would check service history to see if this 
-                # service was already performed recently
-                address_services.append({
-                    "service_id": service['id'],
-                    "service_name": service['name'],
-                    "category_name": service['category_name'],
-                    "description": service['description'],
-                    "is_urgent": service.get('is_urgent', False),
-                    "recommended_date": (now + timedelta(days=14)).isoformat()
-                })
+        for address_id, address_rows in groupby(rows, key=itemgetter('address_id')):
+            total_addresses += 1
+            address_rows = list(address_rows)
+            services_due = [services_by_id[row['service_id']] for row in address_rows
+                            if row['service_id'] is not None]
             
-            if address_services:
+            if services_due:
+                address = address_rows[0]
                 recommendations.append({
-                    "address_id": address['id'],
+                    "address_id": address_id,
                     "address": f"{address['street']}, {address['city']}, {address['state']} {address['zip']}",
-                    "services_due": address_services
+                    "services_due": services_due
                 })
         
+        if not total_addresses:
+            return {"error": "No addresses found"}
+        
         # Update progress to 100%
         task_progress(check_seasonal_services.current_task.task_id, 100, "Seasonal service check complete")
         
         # Return summary
         summary = {
             "seasonal_check_date": now.isoformat(),
-            "total_addresses": len(addresses),
+            "total_addresses": total_addresses,
             "total_seasonal_services": len(seasonal_services),
             "current_season_services": len(current_season_services),
             "addresses_with_recommendations": len(recommendations),
@@ -252,6 +301,34 @@ def check_seasonal_services():
         
         raise e
 
+def _finish_property_analysis(address_id, user_id, task):
+    """
+    Release the in-flight slot for an analysis and cache its outcome.
+    
+    Args:
+        address_id: ID of the analyzed address
+        user_id: User the analysis was requested for
+        task: Finished analysis Task
+    """
+    with _inflight_lock:
+        _inflight_analyses.pop((address_id, user_id), None)
+    
+    key = _insights_cache_key(address_id)
+    
+    if task.status == TaskStatus.COMPLETED:
+        set_cached_data(key, _dumps({
+            "success": True,
+            "task_id": task.task_id,
+            "status": task.status,
+            "insights": task.result
+        }), ttl=PROPERTY_INSIGHTS_TTL, namespace="property_insights")
+    elif task.status == TaskStatus.FAILED and (task.error or {}).get('type') == AddressNotFoundError.__name__:
+        # Cache the miss too, so unknown addresses don't keep spawning tasks
+        set_cached_data(key, _dumps({
+            "success": False,
+            "error": task.error['message']
+        }), ttl=PROPERTY_NOT_FOUND_TTL, status=404, namespace="property_insights")
+
 def register_async_data_routes(app):
     """
     Register routes for async data processing with the Flask app.
@@ -273,8 +350,29 @@ def register_async_data_routes(app):
         if not address_id:
             return jsonify({"error": "address_id is required"}), 400
         
-        # Submit the background task
-        task = analyze_property.submit(address_id, user_id)
+        # Serve a recent result (or a recent "not found") without new work
+        cached = get_cached_data(_insights_cache_key(address_id))
+        if cached is not None:
+            return make_cached_response(cached)
+        
+        # Submit the background task, unless one is already running for
+        # this address and user, in which case its task is returned instead
+        inflight_key = (address_id, user_id)
+        with _inflight_lock:
+            task = _inflight_analyses.get(inflight_key)
+            is_new_task = task is None
+            if is_new_task:
+                task = analyze_property.submit(address_id, user_id)
+                _inflight_analyses[inflight_key] = task
+        
+        if is_new_task and not add_task_done_callback(
+            task.task_id, partial(_finish_property_analysis, address_id, user_id)
+        ):
+            # Nothing will release the slot when the task finishes, so don't
+            # hand this task to later requests; its result isn't cached
+            logger.warning(f"Could not track property analysis task {task.task_id}")
+            with _inflight_lock:
+                _inflight_analyses.pop(inflight_key, None)
         
         return jsonify({
             "success": True,
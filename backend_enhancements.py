@@ -18,7 +18,7 @@ from glassrain_production.error_handler import register_error_handlers
 from glassrain_production.rate_limiter import setup_rate_limiting
 from glassrain_production.api_cache import init_cache
 from glassrain_production.task_processor import init_executor, init_task_routes
-from glassrain_production.db_setup_enhancements import setup_enhanced_database
+from glassrain_production.db_setup_enhancements import verify_enhanced_schema
 from glassrain_production.async_data_processor import register_async_data_routes
 from glassrain_production.data_validation import run_comprehensive_validation
 
@@ -38,18 +38,20 @@ def init_backend_enhancements(app):
     try:
         # Initialize database connection pool
         logger.info("Initializing database connection pool...")
-        pool_initialized = init_pool(min_conn=2, max_conn=10)
+        pool_initialized = init_pool()
         
         if not pool_initialized:
             logger.warning("Failed to initialize database connection pool")
             return False
         
-        # Setup enhanced database tables
-        logger.info("Setting up enhanced database tables...")
-        db_setup_success = setup_enhanced_database()
-        
-        if not db_setup_success:
-            logger.warning("Failed to setup enhanced database tables")
+        # Check the enhanced database tables. The DDL runs once per deploy
+        # from the migrations entrypoint, not in every app process.
+        logger.info("Checking enhanced database tables...")
+        if not verify_enhanced_schema():
+            logger.warning(
+                "Enhanced database tables are missing; run "
+                "'python -m glassrain_production.migrations' before starting the app"
+            )
             # Continue anyway, as some features may still work
         
         # Initialize error handlers
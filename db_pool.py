@@ -7,24 +7,64 @@ for each request.
 """
 
 import os
+import uuid
+import atexit
 import logging
+import weakref
 import psycopg2
-from psycopg2.pool import ThreadedConnectionPool
+from contextlib import contextmanager
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 from psycopg2.extras import RealDictCursor
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Pool size, overridable per deployment (e.g. for concurrent validators)
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', 2))
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
+
+# Schema the application's own tables live in. Pooled connections put it
+# first on their search_path (set at connect time, so it costs no extra
+# round trip), with public after it for shared tables.
+DB_SCHEMA = os.environ.get('DB_SCHEMA', 'public')
+
+def _connect_options():
+    """Extra connection arguments applied to every pooled connection."""
+    if DB_SCHEMA == 'public':
+        return {}
+    return {'options': f'-c search_path={DB_SCHEMA},public'}
+
 # Global connection pool
 _pool = None
 
-def init_pool(min_conn=2, max_conn=10):
+# Names of the statements prepared on each pooled connection. Prepared
+# statements live as long as the server session, so pooled connections keep
+# them between requests.
+_prepared_statements = weakref.WeakKeyDictionary()
+
+# Callbacks run when the pool is closed (e.g. to drop caches tied to it)
+_close_callbacks = []
+
+def on_pool_close(callback):
+    """
+    Register a callback to run when the connection pool is closed.
+    
+    Args:
+        callback: Callable taking no arguments
+    """
+    _close_callbacks.append(callback)
+
+def init_pool(min_conn=DB_POOL_MIN, max_conn=DB_POOL_MAX):
     """
     Initialize the connection pool.
     
+    The pool opens min_conn connections up front, so the first requests
+    don't pay for connection setup.
+    
     Args:
-        min_conn: Minimum number of connections in the pool
-        max_conn: Maximum number of connections in the pool
+        min_conn: Minimum number of connections in the pool (DB_POOL_MIN)
+        max_conn: Maximum number of connections in the pool (DB_POOL_MAX)
         
     Returns:
         bool: True if pool initialization was successful, False otherwise
@@ -43,7 +83,7 @@ def init_pool(min_conn=2, max_conn=10):
             # Render often provides postgres:// instead of postgresql://
             database_url = database_url.replace("postgres://", "postgresql://")
             logger.info("Initializing connection pool with DATABASE_URL")
-            _pool = ThreadedConnectionPool(min_conn, max_conn, database_url)
+            _pool = ThreadedConnectionPool(min_conn, max_conn, database_url, **_connect_options())
         else:
             # Alternative: connect using individual environment variables
             dbname = os.environ.get('PGDATABASE', 'postgres')
@@ -61,7 +101,8 @@ def init_pool(min_conn=2, max_conn=10):
                 password=password,
                 host=host,
                 port=port,
-                connect_timeout=10
+                connect_timeout=10,
+                **_connect_options()
             )
         
         # Test the pool with a simple query
@@ -83,10 +124,18 @@ def init_pool(min_conn=2, max_conn=10):
         _pool = None
         return False
 
-def get_connection():
+def get_connection(autocommit=True, readonly=False):
     """
     Get a connection from the pool.
     
+    Args:
+        autocommit: Whether statements commit individually. Pass False to
+            group several statements in one transaction; the caller must
+            then commit or roll back.
+        readonly: Run transactions as read-only REPEATABLE READ snapshots.
+            The options are sent with BEGIN, so this costs no extra round
+            trip. Only meaningful with autocommit=False.
+    
     Returns:
         Connection object or None if the pool is not initialized
     """
@@ -100,8 +149,18 @@ def get_connection():
     
     try:
         conn = _pool.getconn()
-        conn.autocommit = True  # Set autocommit mode
+        conn.autocommit = autocommit
+        if readonly:
+            conn.set_session(
+                isolation_level=extensions.ISOLATION_LEVEL_REPEATABLE_READ,
+                readonly=True
+            )
         return conn
+    except PoolError as e:
+        # ThreadedConnectionPool raises rather than waits when every
+        # connection is borrowed
+        logger.error(f"Connection pool exhausted (DB_POOL_MAX={DB_POOL_MAX}): {str(e)}")
+        return None
     except Exception as e:
         logger.error(f"Error getting connection from pool: {str(e)}")
         return None
@@ -118,11 +177,61 @@ def return_connection(conn):
     if _pool is None or conn is None:
         return
     
+    # Never hand the next borrower a connection with an open or aborted
+    # transaction: roll it back here, and drop connections that are closed
+    # or whose state can't be determined
+    discard = bool(conn.closed)
+    if not discard:
+        status = conn.info.transaction_status
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            discard = True
+        elif status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception as e:
+                logger.warning(f"Discarding connection that failed to roll back: {str(e)}")
+                discard = True
+    
+    # Clear session options set by get_connection(readonly=True)
+    if not discard and conn.readonly:
+        try:
+            conn.set_session(isolation_level='DEFAULT', readonly='DEFAULT')
+        except Exception as e:
+            logger.warning(f"Discarding connection with unresettable session: {str(e)}")
+            discard = True
+    
     try:
-        _pool.putconn(conn)
+        _pool.putconn(conn, close=discard)
     except Exception as e:
         logger.error(f"Error returning connection to pool: {str(e)}")
 
+@contextmanager
+def pooled_conn(autocommit=True, readonly=False):
+    """
+    Borrow a connection from the pool for the duration of a with block.
+    
+    The connection is returned to the pool however the block exits.
+    
+    Args:
+        autocommit: See get_connection
+        readonly: See get_connection
+    
+    Yields:
+        Connection object or None if no connection could be obtained
+    """
+    conn = get_connection(autocommit=autocommit, readonly=readonly)
+    try:
+        yield conn
+    finally:
+        return_connection(conn)
+
+def _rollback_quietly(conn):
+    """Roll back after a failed statement without masking the original error."""
+    try:
+        conn.rollback()
+    except Exception as e:
+        logger.warning(f"Rollback failed: {str(e)}")
+
 def close_pool():
     """Close all connections in the pool and destroy the pool."""
     global _pool
@@ -135,6 +244,16 @@ def close_pool():
             logger.error(f"Error closing connection pool: {str(e)}")
         finally:
             _pool = None
+    
+    for callback in _close_callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Error in pool close callback: {str(e)}")
+
+# Drain the pool cleanly when the process exits. Registered once here rather
+# than in init_pool, so re-initializing the pool doesn't stack exit hooks.
+atexit.register(close_pool)
 
 # Helper functions for common database operations
 def execute_query(query, params=None, cursor_factory=RealDictCursor):
@@ -161,12 +280,82 @@ def execute_query(query, params=None, cursor_factory=RealDictCursor):
         return results
     except Exception as e:
         logger.error(f"Error executing query: {str(e)}")
+        # Autocommit connections have no transaction to roll back, but the
+        # session may still be broken; return_connection discards it if so
         return None
     finally:
         if cursor:
             cursor.close()
         return_connection(conn)
 
+def iter_query(query, params=None, cursor_factory=RealDictCursor, itersize=1000):
+    """
+    Execute a query with a server-side cursor and yield rows as they arrive.
+    
+    Rows are fetched from the server in batches of `itersize`, so large
+    result sets never have to be held in memory at once.
+    
+    Args:
+        query: SQL query string
+        params: Query parameters
+        cursor_factory: Cursor factory to use
+        itersize: Number of rows fetched per network round trip
+        
+    Yields:
+        Query result rows
+        
+    Raises:
+        Any error from the connection or the query, unlike execute_query:
+        the caller has already consumed part of the rows, so ending the
+        iteration early would pass off a partial result as complete
+    """
+    # Named (server-side) cursors only work inside a transaction
+    conn = get_connection(autocommit=False)
+    if conn is None:
+        raise RuntimeError("No database connection available for streaming query")
+    
+    cursor = None
+    try:
+        cursor = conn.cursor(name=f"iq_{uuid.uuid4().hex}", cursor_factory=cursor_factory)
+        cursor.itersize = itersize
+        cursor.execute(query, params or ())
+        for row in cursor:
+            yield row
+    except Exception as e:
+        logger.error(f"Error executing streaming query: {str(e)}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        # return_connection rolls back the read transaction
+        return_connection(conn)
+
+def execute_prepared(cursor, name, statement, params=None):
+    """
+    Execute a statement through a server-side prepared statement.
+    
+    The statement is prepared the first time it is used on a connection;
+    later calls on the same connection skip parsing and planning.
+    
+    Args:
+        cursor: Cursor to execute with
+        name: Prepared statement name (a plain SQL identifier)
+        statement: SQL using $1, $2, ... placeholders
+        params: Parameter values, in placeholder order
+    """
+    conn = cursor.connection
+    prepared = _prepared_statements.setdefault(conn, set())
+    
+    if name not in prepared:
+        cursor.execute(f"PREPARE {name} AS {statement}")
+        prepared.add(name)
+    
+    if params:
+        placeholders = ", ".join(["%s"] * len(params))
+        cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+    else:
+        cursor.execute(f"EXECUTE {name}")
+
 def execute_modify(query, params=None):
     """
     Execute a database modification query (INSERT, UPDATE, DELETE).
@@ -191,7 +380,7 @@ def execute_modify(query, params=None):
         return row_count
     except Exception as e:
         logger.error(f"Error executing modification query: {str(e)}")
-        conn.rollback()
+        _rollback_quietly(conn)
         return None
     finally:
         if cursor:
@@ -223,7 +412,7 @@ def execute_returning(query, params=None, cursor_factory=RealDictCursor):
         return results
     except Exception as e:
         logger.error(f"Error executing returning query: {str(e)}")
-        conn.rollback()
+        _rollback_quietly(conn)
         return None
     finally:
         if cursor:
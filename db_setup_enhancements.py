@@ -5,148 +5,554 @@ This module extends the database setup with tables required for the enhanced fea
 """
 
 import logging
-import os
-import sys
+from concurrent.futures import ThreadPoolExecutor
+from psycopg2 import errors
 
-# Ensure correct paths for imports
-current_dir = os.path.dirname(os.path.abspath(__file__))
-if current_dir not in sys.path:
-    sys.path.append(current_dir)
-
-from glassrain_production.db_pool import get_connection, return_connection
+from glassrain_production.db_pool import pooled_conn, execute_prepared, DB_SCHEMA
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def setup_enhanced_database():
+# DDL for each table and index required by the enhanced features. Row ids
+# are identity columns, BIGINT where the row count grows with traffic.
+_PROPERTY_INSIGHTS_DDL = """
+    CREATE TABLE IF NOT EXISTS property_insights (
+        id INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+        address_id INTEGER NOT NULL,
+        user_id INTEGER,
+        analysis_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        insights_data JSONB NOT NULL,
+        UNIQUE (address_id)
+    )
+"""
+
+# task_history, cache_entries and notification_queue rows are updated after
+# insert (progress, hit_count, sent_at, ...). Leaving 30% of each page free
+# lets updates that don't touch an indexed column stay on the same page as
+# HOT updates, which skip index maintenance.
+#
+# Task IDs are always uuid4 strings (see task_processor.Task), so they are
+# stored as 16-byte UUIDs
+_TASK_HISTORY_DDL = """
+    CREATE TABLE IF NOT EXISTS task_history (
+        id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+        task_id UUID NOT NULL,
+        name VARCHAR(128) NOT NULL,
+        description TEXT,
+        status TEXT NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        started_at TIMESTAMP,
+        completed_at TIMESTAMP,
+        user_id INTEGER,
+        progress REAL DEFAULT 0.0,
+        progress_message TEXT,
+        result_data JSONB,
+        error_data JSONB,
+        UNIQUE (task_id)
+    ) WITH (fillfactor = 70)
+"""
+
+# Cached values and their metadata live in one row, so a lookup (and its
+# hit_count update) touches one index and one heap tuple. Cached values can
+# always be regenerated, so the table is unlogged: writes skip the WAL, at the
+# cost of the table being emptied after a crash.
+_CACHE_ENTRIES_DDL = """
+    CREATE UNLOGGED TABLE IF NOT EXISTS cache_entries (
+        cache_key TEXT PRIMARY KEY,
+        namespace TEXT,
+        data_value JSONB NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP NOT NULL,
+        hit_count INTEGER DEFAULT 0
+    ) WITH (fillfactor = 70)
+"""
+
+# Rate limit records are partitioned by day, so old records are purged by
+# dropping whole partitions instead of DELETE + vacuum. The primary key has
+# to include the partition key, and the id is a BIGSERIAL because identity
+# columns on partitioned tables need PostgreSQL 17. Rows outside every daily
+# partition land in the default partition rather than failing the insert.
+# The records only matter for a short window, so the partitions (which hold
+# the data; the parent can't be unlogged) are unlogged and skip the WAL.
+_RATE_LIMIT_RECORDS_DDL = """
+    CREATE TABLE IF NOT EXISTS rate_limit_records (
+        id BIGSERIAL,
+        client_id TEXT NOT NULL,
+        endpoint TEXT,
+        request_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, request_time)
+    ) PARTITION BY RANGE (request_time)
+"""
+
+# Deployments set up before partitioning have a plain rate_limit_records
+# table, which CREATE TABLE IF NOT EXISTS would keep. It is renamed out of the
+# way (with its indexes, whose names the new table reuses) so the partitioned
+# table can be created, and its recent rows are copied over afterwards.
+_RATE_LIMIT_RECORDS_LEGACY_RENAME_DDL = """
+    DO $$
+    BEGIN
+        IF to_regclass('rate_limit_records') IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM pg_partitioned_table
+            WHERE partrelid = to_regclass('rate_limit_records')
+        ) THEN
+            ALTER TABLE rate_limit_records RENAME TO rate_limit_records_legacy;
+            DROP INDEX IF EXISTS idx_rate_limit_client_time;
+            DROP INDEX IF EXISTS idx_rate_limit_brin;
+        END IF;
+    END $$
+"""
+
+# Only the last day of records matters to rate limiting (see
+# drop_rate_limit_partitions), so older legacy rows aren't copied. They land
+# in the default partition until ensure_rate_limit_partitions moves them.
+_RATE_LIMIT_RECORDS_LEGACY_COPY_DDL = """
+    DO $$
+    BEGIN
+        IF to_regclass('rate_limit_records_legacy') IS NOT NULL THEN
+            INSERT INTO rate_limit_records (client_id, endpoint, request_time)
+            SELECT client_id, endpoint, request_time
+            FROM rate_limit_records_legacy
+            WHERE request_time >= current_date - 1;
+            DROP TABLE rate_limit_records_legacy;
+        END IF;
+    END $$
+"""
+
+_RATE_LIMIT_RECORDS_DEFAULT_DDL = """
+    CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_records_default
+    PARTITION OF rate_limit_records DEFAULT
+"""
+
+# Index for rate limiting
+_RATE_LIMIT_CLIENT_TIME_DDL = """
+    CREATE INDEX IF NOT EXISTS idx_rate_limit_client_time
+    ON rate_limit_records (client_id, request_time)
+"""
+
+_NOTIFICATION_QUEUE_DDL = """
+    CREATE TABLE IF NOT EXISTS notification_queue (
+        id INTEGER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+        user_id INTEGER,
+        notification_type TEXT NOT NULL,
+        title VARCHAR(256) NOT NULL,
+        message TEXT NOT NULL,
+        data_context JSONB,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        scheduled_at TIMESTAMP,
+        sent_at TIMESTAMP,
+        status TEXT DEFAULT 'pending',
+        priority INTEGER DEFAULT 1
+    ) WITH (fillfactor = 70)
+"""
+
+# Rows are appended in request_time order, so a BRIN index (one summary per
+# range of pages) serves time-range purges at a fraction of a B-tree's size.
+# The B-tree above stays for per-client lookups.
+_RATE_LIMIT_TIME_BRIN_DDL = """
+    CREATE INDEX IF NOT EXISTS idx_rate_limit_brin
+    ON rate_limit_records USING BRIN (request_time) WITH (pages_per_range = 32)
+"""
+
+# Supporting indexes for the queue/reaper queries. The partial indexes only
+# cover the rows those queries look for, so they stay small.
+_TASK_ACTIVE_STATUS_DDL = """
+    CREATE INDEX IF NOT EXISTS idx_task_status
+    ON task_history (status) WHERE status IN ('pending', 'running')
+"""
+
+_CACHE_ENTRIES_EXPIRES_DDL = """
+    CREATE INDEX IF NOT EXISTS idx_cache_entries_expires
+    ON cache_entries (expires_at)
+"""
+
+_NOTIFICATION_PENDING_DDL = """
+    CREATE INDEX IF NOT EXISTS idx_notif_status_sched
+    ON notification_queue (status, scheduled_at) WHERE status = 'pending'
+"""
+
+# Compress the JSONB columns with LZ4 rather than the default pglz: it
+# (de)compresses several times faster at a similar ratio. Needs PostgreSQL 14+
+# built with LZ4 support, so the ALTERs only run when the server offers it.
+_JSONB_LZ4_COMPRESSION_DDL = """
+    DO $$
+    BEGIN
+        IF current_setting('server_version_num')::int >= 140000 AND EXISTS (
+            SELECT 1 FROM pg_settings
+            WHERE name = 'default_toast_compression' AND 'lz4' = ANY(enumvals)
+        ) THEN
+            ALTER TABLE property_insights ALTER COLUMN insights_data SET COMPRESSION lz4;
+            ALTER TABLE task_history ALTER COLUMN result_data SET COMPRESSION lz4;
+            ALTER TABLE task_history ALTER COLUMN error_data SET COMPRESSION lz4;
+            ALTER TABLE cache_entries ALTER COLUMN data_value SET COMPRESSION lz4;
+            ALTER TABLE notification_queue ALTER COLUMN data_context SET COMPRESSION lz4;
+        END IF;
+    END $$
+"""
+
+# (object name, DDL) pairs. Statements that don't create an object have no
+# name. The tables don't depend on each other; everything in the second group
+# depends on one of them.
+_TABLE_DDL_STATEMENTS = (
+    ("property_insights", _PROPERTY_INSIGHTS_DDL),
+    ("task_history", _TASK_HISTORY_DDL),
+    ("cache_entries", _CACHE_ENTRIES_DDL),
+    ("rate_limit_records", _RATE_LIMIT_RECORDS_DDL),
+    ("notification_queue", _NOTIFICATION_QUEUE_DDL)
+)
+
+_DEPENDENT_DDL_STATEMENTS = (
+    ("rate_limit_records_default", _RATE_LIMIT_RECORDS_DEFAULT_DDL),
+    ("idx_rate_limit_client_time", _RATE_LIMIT_CLIENT_TIME_DDL),
+    ("idx_rate_limit_brin", _RATE_LIMIT_TIME_BRIN_DDL),
+    ("idx_task_status", _TASK_ACTIVE_STATUS_DDL),
+    ("idx_cache_entries_expires", _CACHE_ENTRIES_EXPIRES_DDL),
+    ("idx_notif_status_sched", _NOTIFICATION_PENDING_DDL),
+    (None, _JSONB_LZ4_COMPRESSION_DDL)
+)
+
+# Keeps the tables out of public when a dedicated schema is configured. The
+# pool puts DB_SCHEMA first on the search_path, so the unqualified CREATE
+# statements that follow land in it.
+_SCHEMA_DDL = 'CREATE SCHEMA IF NOT EXISTS "{}"'.format(DB_SCHEMA.replace('"', '""'))
+
+_SCHEMA_DDL_STATEMENTS = ((None, _SCHEMA_DDL),) if DB_SCHEMA != 'public' else ()
+
+# Run before the tables and after everything else respectively
+_LEGACY_RENAME_DDL_STATEMENTS = ((None, _RATE_LIMIT_RECORDS_LEGACY_RENAME_DDL),)
+_LEGACY_COPY_DDL_STATEMENTS = ((None, _RATE_LIMIT_RECORDS_LEGACY_COPY_DDL),)
+
+# Statement groups in the order they run; statements within a group don't
+# depend on each other
+_DDL_STATEMENT_GROUPS = (
+    _SCHEMA_DDL_STATEMENTS,
+    _LEGACY_RENAME_DDL_STATEMENTS,
+    _TABLE_DDL_STATEMENTS,
+    _DEPENDENT_DDL_STATEMENTS,
+    _LEGACY_COPY_DDL_STATEMENTS
+)
+
+# All statements in creation order
+_DDL_STATEMENTS = tuple(statement for group in _DDL_STATEMENT_GROUPS for statement in group)
+
+# Connections used to retry the DDL statements concurrently
+DDL_FANOUT = 4
+
+# Every table and index the setup creates. When they all exist the DDL is
+# skipped.
+ENHANCED_SCHEMA_OBJECTS = tuple(name for name, _ in _DDL_STATEMENTS if name)
+
+# Whether every object in $1 exists in schema $2 (looked up there explicitly,
+# so same-named tables elsewhere on the search_path don't count). Prepared on
+# first use, so later setups on the same pooled connection skip parsing and
+# planning.
+ENHANCED_SCHEMA_PRESENT_QUERY = """
+    SELECT bool_and(to_regclass(quote_ident($2) || '.' || quote_ident(name)) IS NOT NULL)
+    FROM unnest($1::text[]) AS name
+"""
+
+# Bounds on how long any DDL may wait for a lock or run, so a statement
+# blocked behind another session fails fast and hands its connection back
+# instead of hanging the setup. SET LOCAL lasts until the end of the implicit
+# transaction the multi-statement query runs in, so these are prefixed to
+# every DDL batch rather than set on the (autocommit) session.
+DDL_LOCK_TIMEOUT = '2s'
+DDL_STATEMENT_TIMEOUT = '10s'
+
+_DDL_TIMEOUTS = "SET LOCAL lock_timeout = '{}';\nSET LOCAL statement_timeout = '{}'".format(
+    DDL_LOCK_TIMEOUT, DDL_STATEMENT_TIMEOUT
+)
+
+ENHANCED_SCHEMA_DDL = ";\n".join((_DDL_TIMEOUTS,) + tuple(ddl for _, ddl in _DDL_STATEMENTS))
+
+# How many days ahead of today daily rate limit partitions are created. The
+# scheduled maintenance runs daily, so a week of headroom survives a few
+# missed runs before inserts start landing in the default partition.
+RATE_LIMIT_PARTITION_DAYS_AHEAD = 7
+
+# Creates the daily partition for current_date + %(day_offset)s if it is
+# missing. Dates come from the server, so they match CURRENT_TIMESTAMP
+# defaults. PostgreSQL refuses to attach a partition while the default
+# partition holds rows in its range, so that day's rows are moved out of the
+# default partition and back in through the parent around the CREATE, all in
+# the one implicit transaction.
+_CREATE_RATE_LIMIT_PARTITION = _DDL_TIMEOUTS + """;
+    DO $$
+    DECLARE
+        day date := current_date + %(day_offset)s;
+        partition_name text := 'rate_limit_records_' || to_char(day, 'YYYYMMDD');
+    BEGIN
+        IF to_regclass(partition_name) IS NOT NULL THEN
+            RETURN;
+        END IF;
+        
+        CREATE TEMP TABLE rate_limit_records_moved
+            (LIKE rate_limit_records) ON COMMIT DROP;
+        WITH moved AS (
+            DELETE FROM rate_limit_records_default
+            WHERE request_time >= day AND request_time < day + 1
+            RETURNING *
+        )
+        INSERT INTO rate_limit_records_moved SELECT * FROM moved;
+        
+        EXECUTE format(
+            'CREATE UNLOGGED TABLE %%I PARTITION OF rate_limit_records FOR VALUES FROM (%%L) TO (%%L)',
+            partition_name, day, day + 1
+        );
+        
+        INSERT INTO rate_limit_records SELECT * FROM rate_limit_records_moved;
+    END $$
+"""
+
+# Drops the daily partitions that end more than %(keep_days)s days ago, then
+# purges rows of the same age that went to the default partition while no
+# daily partition covered them
+_DROP_RATE_LIMIT_PARTITIONS = _DDL_TIMEOUTS + """;
+    DO $$
+    DECLARE
+        partition_name text;
+    BEGIN
+        FOR partition_name IN
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'rate_limit_records'::regclass
+              AND c.relname ~ '^rate_limit_records_[0-9]{8}$'
+              AND to_date(right(c.relname, 8), 'YYYYMMDD') < current_date - %(keep_days)s
+        LOOP
+            EXECUTE format('DROP TABLE IF EXISTS %%I', partition_name);
+        END LOOP;
+    END $$;
+    DELETE FROM rate_limit_records_default
+    WHERE request_time < current_date - %(keep_days)s
+"""
+
+# Whether rate_limit_records is the partitioned table. It isn't on
+# deployments that haven't run the migrations since partitioning was added.
+RATE_LIMIT_RECORDS_PARTITIONED_QUERY = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_partitioned_table
+        WHERE partrelid = to_regclass('rate_limit_records')
+    )
+"""
+
+def _rate_limit_records_partitioned(cursor):
+    """Whether rate_limit_records is partitioned, logging a warning if not."""
+    cursor.execute(RATE_LIMIT_RECORDS_PARTITIONED_QUERY)
+    if cursor.fetchone()[0]:
+        return True
+    logger.warning(
+        "rate_limit_records is not partitioned; run "
+        "'python -m glassrain_production.migrations' to migrate it"
+    )
+    return False
+
+def ensure_rate_limit_partitions(days_ahead=RATE_LIMIT_PARTITION_DAYS_AHEAD):
     """
-    Create the additional tables required for enhanced features if they don't exist.
+    Create the daily rate_limit_records partitions for the coming days.
+    
+    Each day is created in its own transaction, so a day that fails (e.g. on
+    a lock timeout) doesn't stop the others.
     
+    Args:
+        days_ahead: Number of days after today to create partitions for
+        
     Returns:
-        bool: True if setup was successful, False otherwise
+        bool: True if every partition exists, False otherwise
     """
-    conn = get_connection()
-    if not conn:
-        logger.error("Failed to get database connection for enhanced setup")
-        return False
-    
-    cursor = None
-    success = False
+    with pooled_conn() as conn:
+        if not conn:
+            logger.error("Failed to get database connection for rate limit partitions")
+            return False
+        
+        success = True
+        with conn.cursor() as cursor:
+            try:
+                if not _rate_limit_records_partitioned(cursor):
+                    return False
+            except Exception as e:
+                logger.error("Error checking rate_limit_records partitioning: %s", e)
+                return False
+            
+            for day_offset in range(days_ahead + 1):
+                try:
+                    cursor.execute(_CREATE_RATE_LIMIT_PARTITION, {"day_offset": day_offset})
+                except Exception as e:
+                    logger.error("Error creating rate limit partition for today + %s: %s", day_offset, e)
+                    success = False
+        return success
+
+def drop_rate_limit_partitions(keep_days=1):
+    """
+    Purge old rate limit records by dropping their daily partitions and
+    deleting them from the default partition.
     
-    try:
-        cursor = conn.cursor()
+    Args:
+        keep_days: Number of days before today whose records are kept
         
-        # Create property_insights table
-        logger.info("Creating property_insights table if it doesn't exist")
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS property_insights (
-                id SERIAL PRIMARY KEY,
-                address_id INTEGER NOT NULL,
-                user_id INTEGER,
-                analysis_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                insights_data JSONB NOT NULL,
-                UNIQUE (address_id)
-            )
-        """)
+    Returns:
+        bool: True if the purge succeeded, False otherwise
+    """
+    with pooled_conn() as conn:
+        if not conn:
+            logger.error("Failed to get database connection for rate limit partitions")
+            return False
         
-        # Create task_history table
-        logger.info("Creating task_history table if it doesn't exist")
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS task_history (
-                id SERIAL PRIMARY KEY,
-                task_id VARCHAR(64) NOT NULL,
-                name VARCHAR(128) NOT NULL,
-                description TEXT,
-                status VARCHAR(32) NOT NULL,
-                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                started_at TIMESTAMP,
-                completed_at TIMESTAMP,
-                user_id INTEGER,
-                progress FLOAT DEFAULT 0.0,
-                progress_message TEXT,
-                result_data JSONB,
-                error_data JSONB,
-                UNIQUE (task_id)
-            )
-        """)
+        try:
+            with conn.cursor() as cursor:
+                if not _rate_limit_records_partitioned(cursor):
+                    return False
+                cursor.execute(_DROP_RATE_LIMIT_PARTITIONS, {"keep_days": keep_days})
+            return True
+        except Exception as e:
+            logger.error("Error dropping rate limit partitions: %s", e)
+            return False
+
+def _run_one_ddl(statement):
+    """
+    Run one DDL statement on its own pooled connection.
+    
+    Args:
+        statement: (object name, DDL) pair
         
-        # Create cache_metadata table
-        logger.info("Creating cache_metadata table if it doesn't exist")
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS cache_metadata (
-                id SERIAL PRIMARY KEY,
-                cache_key VARCHAR(256) NOT NULL,
-                namespace VARCHAR(128),
-                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                expires_at TIMESTAMP NOT NULL,
-                hit_count INTEGER DEFAULT 0,
-                UNIQUE (cache_key)
-            )
-        """)
+    Returns:
+        bool: True if the statement succeeded, False otherwise
+    """
+    name, ddl = statement
+    
+    with pooled_conn() as conn:
+        if not conn:
+            logger.error("❌ No database connection to create %s", name or "schema settings")
+            return False
         
-        # Create cache_data table
-        logger.info("Creating cache_data table if it doesn't exist")
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS cache_data (
-                id SERIAL PRIMARY KEY,
-                cache_key VARCHAR(256) NOT NULL,
-                data_value JSONB NOT NULL,
-                UNIQUE (cache_key)
-            )
-        """)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(_DDL_TIMEOUTS + ";\n" + ddl)
+            return True
+        except (errors.LockNotAvailable, errors.QueryCanceled) as e:
+            logger.error("❌ Timed out creating %s: %s", name or "schema settings", e)
+            return False
+        except Exception as e:
+            logger.error("❌ Error creating %s: %s", name or "schema settings", e)
+            return False
+
+def _run_schema_ddl(conn):
+    """
+    Run the schema DDL on an autocommit connection.
+    
+    The whole script is tried first, in one round trip. If it fails it has
+    been rolled back as a whole, so every statement is then retried on its
+    own: each commits independently, and one failing statement (say, an
+    index) no longer takes the tables created before it down with it. The
+    retries run concurrently over DDL_FANOUT connections, one group of
+    _DDL_STATEMENT_GROUPS at a time: the schema, the rename of an
+    unpartitioned rate_limit_records, the tables, the objects that depend on
+    them, then the copy of the legacy rate limit records.
+    
+    A script that times out waiting for a lock is not retried here: the
+    lock is most likely still held, so it returns False for the caller to
+    retry later.
+    
+    Args:
+        conn: Connection in autocommit mode
         
-        # Create rate_limit_records table
-        logger.info("Creating rate_limit_records table if it doesn't exist")
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS rate_limit_records (
-                id SERIAL PRIMARY KEY,
-                client_id VARCHAR(128) NOT NULL,
-                endpoint VARCHAR(256),
-                request_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+    Returns:
+        bool: True if every statement succeeded, False otherwise
+    """
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(ENHANCED_SCHEMA_DDL)
+        return True
+    except (errors.LockNotAvailable, errors.QueryCanceled) as e:
+        logger.error("❌ Schema script timed out: %s", e)
+        return False
+    except Exception as e:
+        logger.warning("Schema script failed, retrying statement by statement: %s", e)
+    
+    success = True
+    with ThreadPoolExecutor(max_workers=DDL_FANOUT) as executor:
+        for statements in _DDL_STATEMENT_GROUPS:
+            if not all(list(executor.map(_run_one_ddl, statements))):
+                success = False
+    
+    return success
+
+def _schema_present(cursor):
+    """Whether every enhanced table and index already exists."""
+    execute_prepared(
+        cursor, "enhanced_schema_present", ENHANCED_SCHEMA_PRESENT_QUERY,
+        (list(ENHANCED_SCHEMA_OBJECTS), DB_SCHEMA)
+    )
+    return bool(cursor.fetchone()[0])
+
+def verify_enhanced_schema():
+    """
+    Check that the enhanced tables exist, without running any DDL.
+    
+    This is what app startup runs; the DDL itself is applied once per
+    deploy by the migrations entrypoint (python -m glassrain_production.migrations).
+    
+    Returns:
+        bool: True if every enhanced table and index exists, False otherwise
+    """
+    with pooled_conn() as conn:
+        if not conn:
+            logger.error("Failed to get database connection for schema check")
+            return False
         
-        # Add index for rate limiting
         try:
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_rate_limit_client_time 
-                ON rate_limit_records (client_id, request_time)
-            """)
+            with conn.cursor() as cursor:
+                return _schema_present(cursor)
         except Exception as e:
-            logger.warning(f"Failed to create index on rate_limit_records: {str(e)}")
-        
-        # Create notification_queue table
-        logger.info("Creating notification_queue table if it doesn't exist")
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS notification_queue (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER,
-                notification_type VARCHAR(64) NOT NULL,
-                title VARCHAR(256) NOT NULL,
-                message TEXT NOT NULL,
-                data_context JSONB,
-                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                scheduled_at TIMESTAMP,
-                sent_at TIMESTAMP,
-                status VARCHAR(32) DEFAULT 'pending',
-                priority INTEGER DEFAULT 1
-            )
-        """)
+            logger.error("Error checking enhanced database schema: %s", e)
+            return False
+
+def setup_enhanced_database():
+    """
+    Create the additional tables required for enhanced features if they don't exist.
+    
+    Runs from the migrations entrypoint rather than on every app start.
+    
+    cache_entries and the rate_limit_records partitions are UNLOGGED: their
+    writes skip the WAL, but they are emptied after a crash and not
+    replicated. Both only hold data that is regenerated or short-lived.
+    
+    Returns:
+        bool: True if setup was successful, False otherwise
+    """
+    # Autocommit, so psycopg2 sends no separate BEGIN and COMMIT: the script
+    # commits (or rolls back as a whole) by itself
+    with pooled_conn() as conn:
+        if not conn:
+            logger.error("Failed to get database connection for enhanced setup")
+            return False
         
-        conn.commit()
-        success = True
-        logger.info("✅ Enhanced database setup completed successfully")
+        try:
+            with conn.cursor() as cursor:
+                # When everything already exists, one cheap lookup saves
+                # running the DDL, which takes catalog locks even as a no-op
+                schema_present = _schema_present(cursor)
+        except Exception as e:
+            logger.error("❌ Error setting up enhanced database: %s", e)
+            return False
         
-    except Exception as e:
-        conn.rollback()
-        logger.error(f"❌ Error setting up enhanced database: {str(e)}")
-    finally:
-        if cursor:
-            cursor.close()
-        return_connection(conn)
+        if schema_present:
+            logger.info("Enhanced database tables already exist")
+        else:
+            logger.info("Creating enhanced feature tables if they don't exist")
+            logger.debug("Ensuring enhanced schema objects: %s", ENHANCED_SCHEMA_OBJECTS)
+            if not _run_schema_ddl(conn):
+                return False
+            logger.info("✅ Enhanced database setup completed successfully")
     
-    return success
+    # New days need new partitions, so this runs even when the tables exist.
+    # Inserts fall back to the default partition, so a failure here isn't
+    # fatal.
+    if not ensure_rate_limit_partitions():
+        logger.warning("Rate limit records will go to the default partition")
+    
+    return True
 
 if __name__ == "__main__":
     # Run database setup directly when executed as a script
-    setup_enhanced_database()
\ No newline at end of file
+    from glassrain_production.migrations import main
+    main()
\ No newline at end of file
@@ -14,6 +14,7 @@ Key features:
 """
 
 import os
+import sys
 import json
 import logging
 import datetime
@@ -728,8 +729,45 @@ def setup_maintenance_tables():
             conn.rollback()
             conn.close()
 
+def run_database_maintenance() -> Dict[str, Any]:
+    """
+    Run the daily database housekeeping jobs.
+    
+    Creates the rate limit partitions for the coming days and purges expired
+    rate limit records. Meant to run once a day from a cron job
+    (python -m glassrain_production.maintenance_scheduler database), not from
+    the app processes.
+    
+    Returns:
+        Dictionary with the result of each job
+    """
+    from glassrain_production.db_pool import init_pool, close_pool
+    from glassrain_production.db_setup_enhancements import (
+        ensure_rate_limit_partitions, drop_rate_limit_partitions
+    )
+    
+    if not init_pool(min_conn=1):
+        logger.error("Database connection failed")
+        return {"error": "Database connection failed"}
+    
+    try:
+        results = {
+            "rate_limit_partitions_created": ensure_rate_limit_partitions(),
+            "rate_limit_records_purged": drop_rate_limit_partitions(),
+        }
+    finally:
+        close_pool()
+    
+    results["success"] = all(results.values())
+    logger.info(f"Database maintenance finished: {results}")
+    return results
+
 # For testing and direct module usage
 if __name__ == "__main__":
+    if sys.argv[1:] == ["database"]:
+        # Daily database housekeeping, run from a cron job
+        sys.exit(0 if run_database_maintenance().get("success") else 1)
+    
     # Create tables
     setup_maintenance_tables()
     
@@ -0,0 +1,55 @@
+"""
+Database Migrations Entrypoint for GlassRain
+
+Applies the enhanced database schema. Run once per deploy (e.g. as a
+pre-deploy command) rather than from every app process:
+
+    python -m glassrain_production.migrations
+"""
+
+import logging
+import sys
+import time
+
+from glassrain_production.db_pool import init_pool, close_pool
+from glassrain_production.db_setup_enhancements import setup_enhanced_database
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Attempts at the schema setup, doubling the delay after each failure. The
+# DDL gives up quickly on locks held by other sessions, so a retry a few
+# seconds later usually gets through.
+MIGRATION_ATTEMPTS = 4
+MIGRATION_RETRY_DELAY = 2
+
+def main():
+    """
+    Apply the schema and exit with a non-zero status if it fails.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    
+    if not init_pool(min_conn=1):
+        logger.error("❌ Could not connect to the database")
+        sys.exit(1)
+    
+    success = False
+    try:
+        for attempt in range(MIGRATION_ATTEMPTS):
+            if attempt:
+                delay = MIGRATION_RETRY_DELAY * 2 ** (attempt - 1)
+                logger.warning("Schema setup failed, retrying in %ss", delay)
+                time.sleep(delay)
+            success = setup_enhanced_database()
+            if success:
+                break
+    finally:
+        close_pool()
+    
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
@@ -148,6 +148,7 @@ def submit_task(func, *args, name=None, description=None, timeout=None, user_id=
         except Exception as e:
             # Handle errors
             error_details = {
+                'type': type(e).__name__,
                 'message': str(e),
                 'traceback': traceback.format_exc()
             }
@@ -254,6 +255,29 @@ def cancel_task(task_id):
     
     return False
 
+def add_task_done_callback(task_id, callback):
+    """
+    Register a callback to run once a task has finished.
+    
+    The callback is called with the Task object, whatever its final status.
+    If the task has already finished, the callback runs immediately.
+    
+    Args:
+        task_id: Task ID
+        callback: Callable taking the Task object
+        
+    Returns:
+        bool: True if the callback was registered, False if the task is unknown
+    """
+    task = get_task(task_id)
+    future = get_executor().futures.get(task_id)
+    
+    if not task or future is None:
+        return False
+    
+    future.add_done_callback(lambda _future: callback(task))
+    return True
+
 def task_progress(task_id, progress, message=None):
     """
     Update task progress.
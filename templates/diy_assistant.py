@@ -9,18 +9,144 @@ expert answers to home improvement questions.
 import os
 import re
 import json
+import time
+import asyncio
+import heapq
+import hashlib
 import logging
 import random
-import requests
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Iterator
 from datetime import datetime
-from openai import OpenAI
+from functools import cached_property, lru_cache
+from collections import OrderedDict, defaultdict, namedtuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# HTTP/2 lets concurrent OpenAI requests share one connection; httpx needs
+# the h2 package for it
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 # Configure logging
 logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('diy_assistant')
 
+# Maximum number of questions ask_questions_async sends to OpenAI at once
+DIY_MAX_PARALLEL = int(os.environ.get('DIY_MAX_PARALLEL', '8'))
+
+# Sample DIY projects, shared by every DIYAssistant in the process
+PROJECTS_CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'diy_projects.json')
+
+# Retries the OpenAI client makes itself, with jittered exponential backoff,
+# on rate limits (429), server errors and connection errors
+OPENAI_MAX_RETRIES = 2
+
+# Consecutive failed API calls after which the assistant stops calling
+# OpenAI and serves fallback responses, and for how long (seconds)
+OPENAI_BREAKER_FAIL_MAX = 5
+OPENAI_BREAKER_RESET_TIMEOUT = 30
+
+# Connection pool limits for the OpenAI HTTP clients
+HTTP_MAX_CONNECTIONS = 32
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 16
+
+# Answers to repeated questions are served from memory for this long
+# (seconds); only the most recently used QA_CACHE_MAX_ENTRIES are kept
+QA_CACHE_TTL = 1800
+QA_CACHE_MAX_ENTRIES = 512
+
+# Search terms made only of these characters are looked up in the token index
+SEARCH_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Keywords picking the fallback response for a question, matched anywhere
+# in it (so 'plumb' also matches 'plumbing')
+PAINTING_QUESTION_RE = re.compile('paint|painting')
+PLUMBING_QUESTION_RE = re.compile('plumb|leak|pipe|toilet|faucet')
+FLOORING_QUESTION_RE = re.compile('floor|tile|laminate')
+ELECTRICAL_QUESTION_RE = re.compile('electric|wiring|outlet')
+
+# Output token limit for ask_questions_batch, which otherwise allows the
+# usual 800 tokens per question
+BATCH_MAX_TOKENS = 4096
+
+# Splits a batched response on its '### n' answer headers
+BATCH_ANSWER_RE = re.compile(r"^#+\s*(\d+)\b[.:)]?[ \t]*", re.MULTILINE)
+
+# Painting supplies whose quantity and cost don't depend on the room size
+PAINTING_FIXED_MATERIALS = (
+    {
+        'name': 'Paint Rollers',
+        'quantity': '2-3',
+        'estimated_cost': "$15-25"
+    },
+    {
+        'name': 'Paint Brushes (various sizes)',
+        'quantity': '3-5',
+        'estimated_cost': "$20-40"
+    },
+    {
+        'name': 'Drop Cloths',
+        'quantity': '2-3',
+        'estimated_cost': "$15-30"
+    },
+    {
+        'name': 'Painter\'s Tape',
+        'quantity': '2-3 rolls',
+        'estimated_cost': "$15-25"
+    }
+)
+
+# Keywords analyze_image responds to, matched anywhere in the question
+IMAGE_QUESTION_RE = re.compile('leak|water|paint|crack')
+
+# System prompt for answering DIY questions. Always sent first and
+# byte-identical, so every question request shares the same prompt prefix.
+QUESTION_SYSTEM_PROMPT = (
+    "You are a knowledgeable home improvement and DIY expert. "
+    "Provide clear, accurate, and helpful advice about home repairs, renovations, "
+    "and DIY projects. Include specific steps, tool recommendations, safety precautions, "
+    "and approximate costs when relevant. Keep responses concise but thorough."
+)
+
+def _http_client_options():
+    """Keyword arguments for the httpx clients behind the OpenAI clients"""
+    import httpx
+    return {
+        "timeout": 60.0,
+        "http2": HTTP2_AVAILABLE,
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+        )
+    }
+
+# Lookup structures over the projects database. by_id maps project IDs to
+# projects; by_difficulty, by_category and by_token map lowercased keys to
+# project positions; search_text and popularity_rank are per position;
+# categories lists the distinct categories, sorted.
+ProjectIndex = namedtuple(
+    'ProjectIndex',
+    ['by_id', 'by_difficulty', 'by_category', 'by_token', 'search_text', 'popularity_rank', 'categories']
+)
+
+@lru_cache(maxsize=1)
+def _load_projects_catalog() -> List[Dict[str, Any]]:
+    """Read the sample projects catalog, once per process"""
+    if orjson:
+        with open(PROJECTS_CATALOG_FILE, 'rb') as f:
+            return orjson.loads(f.read())
+    
+    with open(PROJECTS_CATALOG_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
 class DIYAssistant:
     """DIY Assistant for home improvement projects and advice"""
     
@@ -32,25 +158,51 @@ class DIYAssistant:
             api_key (str, optional): OpenAI API key for AI assistance
         """
         self.api_key = api_key or os.environ.get('OPENAI_API_KEY', '')
-        self.openai_client = None
         
-        if self.api_key:
-            try:
-                import httpx
-                # Create httpx client explicitly without proxies
-                http_client = httpx.Client(timeout=60.0)
-                self.openai_client = OpenAI(api_key=self.api_key, http_client=http_client)
-                logger.info("OpenAI client initialized in DIY assistant")
-            except Exception as e:
-                logger.error(f"Error initializing OpenAI client in DIY assistant: {str(e)}")
+        # Recent answers, keyed by a hash of the request
+        self._qa_cache = OrderedDict()
+        self._qa_cache_lock = threading.Lock()
         
-        # Load project database
-        self.projects_db = self._load_projects_database()
-        self.categories = self._extract_categories()
+        # Circuit breaker state for the OpenAI API
+        self._api_failures = 0
+        self._api_open_until = 0.0
+        self._api_lock = threading.Lock()
+        
+        # The OpenAI client and the project database are set up on first
+        # use, so callers that never need them don't pay for them
         self.difficulty_levels = ['easy', 'medium', 'advanced', 'expert']
+        self._difficulty_set = frozenset(self.difficulty_levels)
         
         logger.info("DIY Assistant initialized")
     
+    @cached_property
+    def openai_client(self):
+        """OpenAI client, or None without an API key or if it can't be created"""
+        if not self.api_key:
+            return None
+        
+        try:
+            import httpx
+            from openai import OpenAI
+            # Create httpx client explicitly without proxies
+            http_client = httpx.Client(**_http_client_options())
+            client = OpenAI(api_key=self.api_key, http_client=http_client, max_retries=OPENAI_MAX_RETRIES)
+            logger.info("OpenAI client initialized in DIY assistant")
+            return client
+        except Exception as e:
+            logger.error(f"Error initializing OpenAI client in DIY assistant: {str(e)}")
+            return None
+    
+    @cached_property
+    def projects_db(self) -> List[Dict[str, Any]]:
+        """The DIY projects database"""
+        return self._load_projects_database()
+    
+    @property
+    def categories(self) -> List[str]:
+        """Unique project categories, sorted"""
+        return self._project_index.categories
+    
     def get_projects(self, difficulty=None, category=None, search=None) -> List[Dict[str, Any]]:
         """
         Get DIY projects filtered by difficulty, category, and/or search term
@@ -66,34 +218,36 @@ class DIYAssistant:
         logger.info(f"Getting projects with filters - difficulty: {difficulty}, category: {category}, search: {search}")
         
         try:
-            filtered_projects = self.projects_db.copy()
+            index = self._project_index
+            candidates = set(range(len(self.projects_db)))
             
             # Filter by difficulty
-            if difficulty and difficulty.lower() in self.difficulty_levels:
-                filtered_projects = [p for p in filtered_projects if p.get('difficulty', '').lower() == difficulty.lower()]
+            if difficulty:
+                difficulty = difficulty.lower()
+                if difficulty in self._difficulty_set:
+                    candidates &= index.by_difficulty.get(difficulty, set())
             
             # Filter by category
             if category:
-                filtered_projects = [p for p in filtered_projects if category.lower() in p.get('category', '').lower()]
+                candidates &= self._matching(index.by_category, category.lower())
             
-            # Filter by search term
+            # Filter by search term (any term may match)
             if search:
-                search_terms = search.lower().split()
-                filtered_projects = [
-                    p for p in filtered_projects 
-                    if any(
-                        term in p.get('title', '').lower() or 
-                        term in p.get('description', '').lower() or
-                        term in p.get('category', '').lower() or
-                        any(term in tag.lower() for tag in p.get('tags', []))
-                        for term in search_terms
-                    )
-                ]
+                matches = set()
+                for term in search.lower().split():
+                    if SEARCH_TOKEN_RE.fullmatch(term):
+                        matches |= self._matching(index.by_token, term)
+                    else:
+                        # Terms with punctuation can span tokens, so match
+                        # them against the whole text
+                        matches |= {i for i, text in enumerate(index.search_text) if term in text}
+                candidates &= matches
             
-            # Sort by popularity (if available) or alphabetically
-            filtered_projects.sort(key=lambda x: (-(x.get('popularity', 0)), x.get('title', '')))
+            # Most popular (if available) or alphabetically first, limited
+            # to 20 results
+            top = heapq.nsmallest(20, candidates, key=index.popularity_rank.__getitem__)
             
-            return filtered_projects[:20]  # Limit to 20 results
+            return [self.projects_db[i] for i in top]
             
         except Exception as e:
             logger.error(f"Error getting projects: {str(e)}")
@@ -110,12 +264,7 @@ class DIYAssistant:
             dict: Project details
         """
         try:
-            # Find project by ID
-            for project in self.projects_db:
-                if project.get('id') == project_id:
-                    return project
-            
-            return {}
+            return self._project_index.by_id.get(project_id, {})
             
         except Exception as e:
             logger.error(f"Error getting project details: {str(e)}")
@@ -141,28 +290,33 @@ class DIYAssistant:
                 logger.warning("OpenAI API key not available, using fallback responses")
                 return self._get_fallback_response(question)
             
-            # Use the OpenAI client for API call
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May, 2024
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": """You are a knowledgeable home improvement and DIY expert. 
-                                    Provide clear, accurate, and helpful advice about home repairs, renovations,
-                                    and DIY projects. Include specific steps, tool recommendations, safety precautions,
-                                    and approximate costs when relevant. Keep responses concise but thorough."""
-                    },
-                    {
-                        "role": "user", 
-                        "content": question
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=800
-            )
+            request = self._question_request(question)
+            cache_key = self._qa_cache_key(request)
+            answer = self._get_cached_answer(cache_key)
+            if answer is not None:
+                return answer
             
-            # Extract content from the response
-            answer = response.choices[0].message.content.strip()
+            if not self._api_available():
+                return self._get_fallback_response(question)
+            
+            # Use the OpenAI client for API call. Only errors from the call
+            # itself count towards the circuit breaker.
+            try:
+                response = self.openai_client.chat.completions.create(**request)
+            except Exception as e:
+                logger.error(f"Error calling OpenAI API: {str(e)}")
+                self._record_api_result(False)
+                return self._get_fallback_response(question)
+            self._record_api_result(True)
+            
+            # Extract content from the response. It is None when the model
+            # returns no text (e.g. a refusal); that isn't cached.
+            answer = response.choices[0].message.content
+            if answer is None or not answer.strip():
+                logger.warning("OpenAI API returned an empty answer")
+                return self._get_fallback_response(question)
+            answer = answer.strip()
+            self._cache_answer(cache_key, answer)
             
             return answer
             
@@ -170,6 +324,203 @@ class DIYAssistant:
             logger.error(f"Error answering question: {str(e)}")
             return self._get_fallback_response(question)
     
+    def ask_question_stream(self, question: str) -> Iterator[str]:
+        """
+        Stream an AI-generated answer to a DIY question as it is generated
+        
+        Yields the answer in pieces as they arrive from the API, so clients
+        can start rendering long before the full answer is done. Cached
+        answers and fallback responses are yielded in one piece.
+        
+        Args:
+            question (str): The DIY question
+            
+        Yields:
+            str: The next piece of the answer
+        """
+        if not question:
+            yield "Please ask a home improvement or DIY question."
+            return
+        
+        logger.info(f"Streaming answer to DIY question: {question}")
+        
+        if not self.openai_client:
+            logger.warning("OpenAI API key not available, using fallback responses")
+            yield self._get_fallback_response(question)
+            return
+        
+        request = self._question_request(question)
+        cache_key = self._qa_cache_key(request)
+        answer = self._get_cached_answer(cache_key)
+        if answer is not None:
+            yield answer
+            return
+        
+        if not self._api_available():
+            yield self._get_fallback_response(question)
+            return
+        
+        parts = []
+        try:
+            stream = self.openai_client.chat.completions.create(**request, stream=True)
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            logger.error(f"Error streaming answer: {str(e)}")
+            self._record_api_result(False)
+            # Once part of the answer has gone out there is nothing sensible
+            # to append, so the fallback only replaces an answer never started
+            if not parts:
+                yield self._get_fallback_response(question)
+            return
+        
+        self._record_api_result(True)
+        
+        # Only complete answers are cached
+        if parts:
+            self._cache_answer(cache_key, "".join(parts).strip())
+    
+    async def ask_questions_async(self, questions: List[str]) -> List[str]:
+        """
+        Get AI-generated answers to several DIY questions concurrently
+        
+        Up to DIY_MAX_PARALLEL requests are in flight at once, so a batch
+        takes about as long as its slowest few questions rather than the
+        sum of all of them.
+        
+        Args:
+            questions (list): The DIY questions
+            
+        Returns:
+            list: The answers, in the same order as the questions
+        """
+        if not self.api_key:
+            logger.warning("OpenAI API key not available, using fallback responses")
+            return [self.ask_question(question) for question in questions]
+        
+        logger.info(f"Answering {len(questions)} DIY questions")
+        
+        semaphore = asyncio.Semaphore(DIY_MAX_PARALLEL)
+        
+        async def answer_one(client, question):
+            if not question:
+                return "Please ask a home improvement or DIY question."
+            
+            request = self._question_request(question)
+            cache_key = self._qa_cache_key(request)
+            answer = self._get_cached_answer(cache_key)
+            if answer is not None:
+                return answer
+            
+            if not self._api_available():
+                return self._get_fallback_response(question)
+            
+            try:
+                async with semaphore:
+                    response = await client.chat.completions.create(**request)
+            except Exception as e:
+                logger.error(f"Error calling OpenAI API: {str(e)}")
+                self._record_api_result(False)
+                return self._get_fallback_response(question)
+            self._record_api_result(True)
+            
+            answer = response.choices[0].message.content
+            if answer is None or not answer.strip():
+                logger.warning("OpenAI API returned an empty answer")
+                return self._get_fallback_response(question)
+            answer = answer.strip()
+            self._cache_answer(cache_key, answer)
+            return answer
+        
+        # The client's connection pool belongs to the running event loop, so
+        # each batch gets its own client
+        try:
+            import httpx
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(
+                api_key=self.api_key,
+                http_client=httpx.AsyncClient(**_http_client_options()),
+                max_retries=OPENAI_MAX_RETRIES
+            )
+        except Exception as e:
+            logger.error(f"Error initializing async OpenAI client in DIY assistant: {str(e)}")
+            return [
+                self._get_fallback_response(question) if question
+                else "Please ask a home improvement or DIY question."
+                for question in questions
+            ]
+        
+        async with client:
+            return await asyncio.gather(*(answer_one(client, question) for question in questions))
+    
+    def ask_questions_batch(self, questions: List[str]) -> List[str]:
+        """
+        Get AI-generated answers to several DIY questions in one API call
+        
+        The questions are numbered in a single prompt and the answers split
+        back out of the response. Any answer missing from the response is
+        asked for on its own.
+        
+        Args:
+            questions (list): The DIY questions
+            
+        Returns:
+            list: The answers, in the same order as the questions
+        """
+        if len(questions) <= 1 or not self.openai_client or not self._api_available():
+            return [self.ask_question(question) for question in questions]
+        
+        logger.info(f"Answering {len(questions)} DIY questions in one request")
+        
+        prompt = "Answer each of the following DIY questions concisely. Prefix each answer with `### n`, where n is the question's number.\n"
+        prompt += "\n".join(f"{i}. {question}" for i, question in enumerate(questions, 1))
+        
+        request = self._question_request(prompt)
+        request["max_tokens"] = min(800 * len(questions), BATCH_MAX_TOKENS)
+        
+        answers = {}
+        try:
+            response = self.openai_client.chat.completions.create(**request)
+            self._record_api_result(True)
+            content = response.choices[0].message.content or ""
+            
+            # ['preamble', '1', 'first answer', '2', 'second answer', ...]
+            parts = BATCH_ANSWER_RE.split(content)
+            for number, answer in zip(parts[1::2], parts[2::2]):
+                if answer.strip():
+                    answers[int(number)] = answer.strip()
+        except Exception as e:
+            logger.error(f"Error answering batched questions: {str(e)}")
+            self._record_api_result(False)
+        
+        return [
+            answers.get(i) or self.ask_question(question)
+            for i, question in enumerate(questions, 1)
+        ]
+    
+    def _question_request(self, question: str) -> Dict[str, Any]:
+        """Build the chat completion arguments for a DIY question"""
+        return {
+            "model": "gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May, 2024
+            "messages": [
+                {
+                    "role": "system", 
+                    "content": QUESTION_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user", 
+                    "content": question
+                }
+            ],
+            "temperature": 0.7,
+            "max_tokens": 800
+        }
+    
     def analyze_image(self, image_data, question=None):
         """
         Analyze an image of a DIY project or home issue
@@ -200,11 +551,15 @@ class DIYAssistant:
             if question:
                 analysis += f" Regarding your question: '{question}', "
                 
-                if "leak" in question.lower() or "water" in question.lower():
+                # Every keyword in the question, in one pass; the checks
+                # below keep their order of precedence
+                keywords = set(IMAGE_QUESTION_RE.findall(question.lower()))
+                
+                if "leak" in keywords or "water" in keywords:
                     analysis += "I can see signs of water damage that may indicate a leak. "
-                elif "paint" in question.lower():
+                elif "paint" in keywords:
                     analysis += "the surface appears to need proper preparation before painting. "
-                elif "crack" in question.lower():
+                elif "crack" in keywords:
                     analysis += "there are visible cracks that should be addressed. "
                 
             recommendations = [
@@ -259,26 +614,7 @@ class DIYAssistant:
                             'quantity': f"{primer_gallons} gallons",
                             'estimated_cost': f"${int(primer_gallons * 25)}-${int(primer_gallons * 35)}"
                         },
-                        {
-                            'name': 'Paint Rollers',
-                            'quantity': '2-3',
-                            'estimated_cost': "$15-25"
-                        },
-                        {
-                            'name': 'Paint Brushes (various sizes)',
-                            'quantity': '3-5',
-                            'estimated_cost': "$20-40"
-                        },
-                        {
-                            'name': 'Drop Cloths',
-                            'quantity': '2-3',
-                            'estimated_cost': "$15-30"
-                        },
-                        {
-                            'name': 'Painter\'s Tape',
-                            'quantity': '2-3 rolls',
-                            'estimated_cost': "$15-25"
-                        }
+                        *PAINTING_FIXED_MATERIALS
                     ],
                     'total_estimated_cost': f"${int((paint_gallons * 42.5) + (primer_gallons * 30) + 80)}-${int((paint_gallons * 50) + (primer_gallons * 35) + 120)}"
                 }
@@ -341,20 +677,185 @@ class DIYAssistant:
                 'total_estimated_cost': 'Unable to calculate'
             }
     
-    def _extract_categories(self) -> List[str]:
-        """Extract unique categories from the projects database"""
+    def get_material_estimates(self, project_type, room_sizes) -> List[Dict[str, Any]]:
+        """
+        Estimate materials for the same DIY project in several rooms
+        
+        Args:
+            project_type (str): Type of project (e.g., 'painting', 'flooring')
+            room_sizes (list): Dimensions of each room
+            
+        Returns:
+            list: Material estimates, in the same order as the rooms
+        """
+        return [self.get_material_estimate(project_type, room_size) for room_size in room_sizes]
+    
+    def get_material_cost_ranges(self, project_type, room_dimensions):
+        """
+        Estimate total material costs for many rooms at once
+        
+        The numeric counterpart of get_material_estimate's
+        total_estimated_cost, computed over all rooms with NumPy, for
+        consumers that want numbers rather than formatted strings (bulk
+        quotes, exports).
+        
+        Args:
+            project_type (str): 'painting' or 'flooring'
+            room_dimensions: Room lengths and widths, as an (N, 2) array-like
+            
+        Returns:
+            tuple: (low, high) arrays of whole-dollar costs, one per room,
+                   or None for other project types
+        """
+        import numpy as np
+        
+        rooms = np.asarray(room_dimensions, dtype=float).reshape(-1, 2)
+        widths = rooms[:, 1]
+        areas = rooms[:, 0] * widths
+        
+        if project_type.lower() == 'painting':
+            paint_gallons = np.round(areas / 350, 1)
+            primer_gallons = np.round(areas / 400, 1)
+            low = (paint_gallons * 42.5) + (primer_gallons * 30) + 80
+            high = (paint_gallons * 50) + (primer_gallons * 35) + 120
+            
+        elif project_type.lower() == 'flooring':
+            boxes = np.round(areas * 1.1 / 22)
+            low = (boxes * 47.5) + (areas * 0.4) + (widths * 12.5) + (areas * 0.25)
+            high = (boxes * 60) + (areas * 0.5) + (widths * 15) + (areas * 0.3)
+            
+        else:
+            logger.warning(f"No cost model for project type: {project_type}")
+            return None
+        
+        return np.trunc(low).astype(int), np.trunc(high).astype(int)
+    
+    def _api_available(self) -> bool:
+        """
+        Whether to call the OpenAI API, or go straight to the fallback
+        
+        After OPENAI_BREAKER_FAIL_MAX consecutive failed calls the API is
+        skipped for OPENAI_BREAKER_RESET_TIMEOUT seconds, so an outage costs
+        one quick fallback per question instead of a full request timeout.
+        After the cooldown calls are let through again; one more failure
+        reopens the breaker.
+        """
+        with self._api_lock:
+            if time.time() < self._api_open_until:
+                logger.warning("OpenAI API recently failing, using fallback responses")
+                return False
+            return True
+    
+    def _record_api_result(self, success: bool):
+        """Count a successful or failed OpenAI API call for the circuit breaker"""
+        with self._api_lock:
+            if success:
+                self._api_failures = 0
+                return
+            
+            self._api_failures += 1
+            if self._api_failures >= OPENAI_BREAKER_FAIL_MAX:
+                self._api_open_until = time.time() + OPENAI_BREAKER_RESET_TIMEOUT
+                logger.error(f"OpenAI API failed {self._api_failures} times in a row, pausing calls for {OPENAI_BREAKER_RESET_TIMEOUT}s")
+    
+    def _qa_cache_key(self, request: Dict[str, Any]) -> str:
+        """
+        Cache key for a question request
+        
+        Questions differing only in case or surrounding whitespace share a
+        key. The model settings are part of the key, so changing them
+        doesn't serve stale answers.
+        """
+        question = request["messages"][-1]["content"].strip().lower()
+        raw = f"{request['model']}|{request['temperature']}|{request['max_tokens']}|{question}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def _get_cached_answer(self, cache_key: str) -> Optional[str]:
+        """Return a cached answer that hasn't expired, or None"""
+        with self._qa_cache_lock:
+            entry = self._qa_cache.get(cache_key)
+            if entry is None:
+                return None
+            
+            answer, cached_at = entry
+            if time.time() - cached_at >= QA_CACHE_TTL:
+                del self._qa_cache[cache_key]
+                return None
+            
+            self._qa_cache.move_to_end(cache_key)
+            return answer
+    
+    def _cache_answer(self, cache_key: str, answer: str):
+        """Cache an answer, evicting the least recently used beyond QA_CACHE_MAX_ENTRIES"""
+        with self._qa_cache_lock:
+            self._qa_cache[cache_key] = (answer, time.time())
+            self._qa_cache.move_to_end(cache_key)
+            while len(self._qa_cache) > QA_CACHE_MAX_ENTRIES:
+                self._qa_cache.popitem(last=False)
+    
+    @cached_property
+    def _project_index(self) -> ProjectIndex:
+        """
+        Index the projects database for get_projects and get_project_details
+        
+        Maps project IDs to projects, and lowercased difficulties, categories
+        and search tokens (from the title, description, category and tags)
+        to the positions of the projects containing them. Also keeps each
+        project's lowercased search text, ranks every project by popularity
+        and collects the categories. Built on first use.
+        """
+        by_id = {p.get('id'): p for p in self.projects_db if p.get('id')}
+        by_difficulty = defaultdict(set)
+        by_category = defaultdict(set)
+        by_token = defaultdict(set)
+        search_text = []
         categories = set()
-        for project in self.projects_db:
-            if 'category' in project and project['category']:
+        
+        for i, project in enumerate(self.projects_db):
+            by_difficulty[project.get('difficulty', '').lower()].add(i)
+            by_category[project.get('category', '').lower()].add(i)
+            if project.get('category'):
                 categories.add(project['category'])
-        return sorted(list(categories))
+            
+            # One field per line; search terms never contain whitespace, so
+            # they can't match across fields
+            text = "\n".join([
+                project.get('title', ''),
+                project.get('description', ''),
+                project.get('category', ''),
+                *project.get('tags', [])
+            ]).lower()
+            search_text.append(text)
+            for token in SEARCH_TOKEN_RE.findall(text):
+                by_token[token].add(i)
+        
+        order = sorted(
+            range(len(self.projects_db)),
+            key=lambda i: (-(self.projects_db[i].get('popularity', 0)), self.projects_db[i].get('title', ''))
+        )
+        popularity_rank = [0] * len(order)
+        for rank, i in enumerate(order):
+            popularity_rank[i] = rank
+        
+        return ProjectIndex(
+            by_id, by_difficulty, by_category, by_token, search_text, popularity_rank, sorted(categories)
+        )
+    
+    @staticmethod
+    def _matching(index: Dict[str, set], term: str) -> set:
+        """Positions of the projects with an index key containing term"""
+        matches = set()
+        for key, positions in index.items():
+            if term in key:
+                matches |= positions
+        return matches
     
     def _get_fallback_response(self, question: str) -> str:
         """Generate a fallback response when the API is unavailable"""
         question_lower = question.lower()
         
         # Check for common DIY questions and provide canned responses
-        if any(word in question_lower for word in ['paint', 'painting']):
+        if PAINTING_QUESTION_RE.search(question_lower):
             return """For painting projects, follow these steps:
 1. Prepare the surface by cleaning and sanding
 2. Apply primer (especially important for new drywall or when changing colors significantly)
@@ -365,7 +866,7 @@ class DIYAssistant:
 For a typical room, you'll need 1-2 gallons of paint depending on the size and wall condition. 
 Quality paint typically costs $30-50 per gallon. Don't forget supplies like drop cloths, tape, rollers, and brushes."""
             
-        elif any(word in question_lower for word in ['plumb', 'leak', 'pipe', 'toilet', 'faucet']):
+        elif PLUMBING_QUESTION_RE.search(question_lower):
             return """For minor plumbing issues:
 1. Always turn off the water supply before beginning work
 2. Use Teflon tape on threaded connections to prevent leaks
@@ -375,7 +876,7 @@ Quality paint typically costs $30-50 per gallon. Don't forget supplies like drop
 
 Basic plumbing tools like an adjustable wrench, pliers, and pipe tape are essential. For more complex jobs involving pipe replacement or moving fixtures, professional help is recommended."""
             
-        elif any(word in question_lower for word in ['floor', 'tile', 'laminate']):
+        elif FLOORING_QUESTION_RE.search(question_lower):
             return """For flooring installation:
 1. Ensure your subfloor is clean, dry, and level
 2. Allow flooring materials to acclimate to your home for 48-72 hours
@@ -385,7 +886,7 @@ Basic plumbing tools like an adjustable wrench, pliers, and pipe tape are essent
 
 For tools, you'll need a saw appropriate for your flooring type, a measuring tape, spacers, and tapping block. Most flooring projects cost $2-10 per square foot in materials depending on quality."""
             
-        elif any(word in question_lower for word in ['electric', 'wiring', 'outlet']):
+        elif ELECTRICAL_QUESTION_RE.search(question_lower):
             return """For electrical work, safety is paramount:
 1. ALWAYS turn off power at the breaker panel before beginning work
 2. Use a voltage tester to confirm power is off
@@ -410,254 +911,5 @@ For more specific advice about your project, please provide details about what y
     def _load_projects_database(self) -> List[Dict[str, Any]]:
         """Load the DIY projects database"""
         # In a real implementation, this would load from a database
-        # For now, return a sample set of projects
-        return [
-            {
-                "id": "p001",
-                "title": "Refresh Your Walls with Paint",
-                "description": "Transform your space with a fresh coat of paint. This beginner-friendly project can dramatically change the look and feel of any room.",
-                "difficulty": "easy",
-                "category": "Interior",
-                "time_estimate": "1-2 days",
-                "cost_estimate": "$100-300",
-                "popularity": 95,
-                "tags": ["painting", "walls", "interior", "decor"],
-                "materials": [
-                    "Interior paint (1-2 gallons per room)",
-                    "Primer (if needed)",
-                    "Paint rollers and frames",
-                    "Paint brushes (various sizes)",
-                    "Paint tray",
-                    "Painter's tape",
-                    "Drop cloths",
-                    "Sandpaper",
-                    "Spackling paste (for holes)",
-                    "Putty knife"
-                ],
-                "tools": [
-                    "Ladder or step stool",
-                    "Screwdriver (for outlet covers)",
-                    "Sanding block"
-                ],
-                "steps": [
-                    "Remove furniture or move to center of room",
-                    "Remove switch plates and outlet covers",
-                    "Clean walls thoroughly",
-                    "Repair holes with spackling and sand smooth",
-                    "Apply painter's tape around trim and fixtures",
-                    "Apply primer if needed (new drywall or major color change)",
-                    "Paint ceiling first, then walls",
-                    "Apply 2 coats, allowing proper drying time",
-                    "Remove tape while paint is still slightly wet",
-                    "Replace outlet covers and furniture"
-                ],
-                "image_url": "/static/diy/painting.jpg",
-                "tips": [
-                    "Choose high-quality paint for better coverage and durability",
-                    "Sample colors on your wall before committing",
-                    "Paint in natural daylight for best color accuracy",
-                    "Cut in edges first, then roll larger areas"
-                ],
-                "safety": [
-                    "Ensure good ventilation",
-                    "Use a sturdy ladder",
-                    "Take breaks to avoid fatigue"
-                ]
-            },
-            {
-                "id": "p002",
-                "title": "Install Luxury Vinyl Plank Flooring",
-                "description": "Replace worn carpet or outdated flooring with modern luxury vinyl planks. Durable, waterproof, and available in many styles.",
-                "difficulty": "medium",
-                "category": "Flooring",
-                "time_estimate": "1-3 days",
-                "cost_estimate": "$2-7 per sq ft",
-                "popularity": 90,
-                "tags": ["flooring", "vinyl", "renovation"],
-                "materials": [
-                    "Luxury vinyl planks (calculate square footage + 10%)",
-                    "Underlayment (if not attached to planks)",
-                    "Transition strips for doorways",
-                    "Spacers (1/4\")"
-                ],
-                "tools": [
-                    "Tape measure",
-                    "Utility knife",
-                    "Square",
-                    "Rubber mallet",
-                    "Tapping block",
-                    "Pull bar",
-                    "Saw for cutting planks"
-                ],
-                "steps": [
-                    "Remove existing flooring and clean subfloor",
-                    "Allow flooring to acclimate (24-48 hours)",
-                    "Install underlayment if needed",
-                    "Plan your layout starting from the longest, straightest wall",
-                    "Leave 1/4\" expansion gap around perimeter",
-                    "Stagger end joints by at least 6 inches",
-                    "Tap planks together using block and mallet",
-                    "Use pull bar for last row",
-                    "Install transition strips at doorways"
-                ],
-                "image_url": "/static/diy/vinyl_flooring.jpg",
-                "tips": [
-                    "Ensure subfloor is clean, dry, and level",
-                    "Mix planks from different boxes for natural variation",
-                    "Work in good lighting to spot alignment issues",
-                    "Save leftover planks for future repairs"
-                ],
-                "safety": [
-                    "Wear knee pads for comfort",
-                    "Use gloves when handling cut planks",
-                    "Keep work area clear of tripping hazards"
-                ]
-            },
-            {
-                "id": "p003",
-                "title": "Install a Ceiling Fan",
-                "description": "Replace an existing light fixture with an energy-efficient ceiling fan to improve air circulation and add style.",
-                "difficulty": "medium",
-                "category": "Electrical",
-                "time_estimate": "2-3 hours",
-                "cost_estimate": "$100-300",
-                "popularity": 85,
-                "tags": ["lighting", "electrical", "energy efficiency"],
-                "materials": [
-                    "Ceiling fan with mounting hardware",
-                    "Wire nuts",
-                    "Electrical tape",
-                    "Fan-rated electrical box (if needed)"
-                ],
-                "tools": [
-                    "Screwdrivers",
-                    "Wire strippers",
-                    "Voltage tester",
-                    "Pliers",
-                    "Ladder",
-                    "Helper (recommended)"
-                ],
-                "steps": [
-                    "Turn off power at circuit breaker",
-                    "Remove existing light fixture",
-                    "Verify electrical box is fan-rated (replace if not)",
-                    "Assemble fan according to manufacturer instructions",
-                    "Connect wiring (usually black to black, white to white, ground to ground)",
-                    "Secure mounting bracket to electrical box",
-                    "Attach fan motor to bracket",
-                    "Install blades and light kit",
-                    "Restore power and test"
-                ],
-                "image_url": "/static/diy/ceiling_fan.jpg",
-                "tips": [
-                    "Choose the right size fan for your room (room sq ft / 4 = fan diameter in inches)",
-                    "For best airflow, blades should be at least 7 feet from floor, 10-12 inches from ceiling",
-                    "Ensure your electrical box is rated for ceiling fans",
-                    "Use a fan with a remote for convenience"
-                ],
-                "safety": [
-                    "ALWAYS verify power is off with a voltage tester",
-                    "Secure ladder on level ground",
-                    "Have a helper assist with holding the fan during installation",
-                    "Do not hang from the fan to test it"
-                ]
-            },
-            {
-                "id": "p004",
-                "title": "Build a Raised Garden Bed",
-                "description": "Create a productive garden space with a custom raised bed. Perfect for growing vegetables, herbs, or flowers.",
-                "difficulty": "easy",
-                "category": "Outdoor",
-                "time_estimate": "2-4 hours",
-                "cost_estimate": "$50-200",
-                "popularity": 88,
-                "tags": ["garden", "outdoor", "woodworking"],
-                "materials": [
-                    "Rot-resistant lumber (cedar or pressure-treated)",
-                    "Galvanized deck screws",
-                    "Landscape fabric",
-                    "Garden soil",
-                    "Compost"
-                ],
-                "tools": [
-                    "Saw",
-                    "Drill/driver",
-                    "Measuring tape",
-                    "Square",
-                    "Level",
-                    "Shovel"
-                ],
-                "steps": [
-                    "Choose a sunny location with good drainage",
-                    "Measure and mark the bed area",
-                    "Cut lumber to desired dimensions (common: 4'x8')",
-                    "Assemble frame with screws (pre-drill to prevent splitting)",
-                    "Level the ground where bed will sit",
-                    "Position frame and check level",
-                    "Line bottom with landscape fabric if desired",
-                    "Fill with soil/compost mix",
-                    "Water thoroughly before planting"
-                ],
-                "image_url": "/static/diy/garden_bed.jpg",
-                "tips": [
-                    "Standard depth is 10-12 inches for most plants",
-                    "Consider adding a drip irrigation system",
-                    "For longevity, use cedar, redwood, or heat-treated lumber",
-                    "Add vertical supports for trellising if growing climbing plants"
-                ],
-                "safety": [
-                    "Wear gloves when handling lumber",
-                    "Use eye protection when cutting wood",
-                    "Lift with your legs when moving soil"
-                ]
-            },
-            {
-                "id": "p005",
-                "title": "Upgrade Your Kitchen Faucet",
-                "description": "Replace an old kitchen faucet with a modern fixture to improve functionality and update your kitchen's look.",
-                "difficulty": "medium",
-                "category": "Plumbing",
-                "time_estimate": "1-2 hours",
-                "cost_estimate": "$75-300",
-                "popularity": 82,
-                "tags": ["kitchen", "plumbing", "fixtures"],
-                "materials": [
-                    "New kitchen faucet",
-                    "Plumber's putty or silicone",
-                    "Teflon tape",
-                    "Supply lines (if not included with faucet)"
-                ],
-                "tools": [
-                    "Basin wrench or channel-lock pliers",
-                    "Adjustable wrench",
-                    "Flashlight",
-                    "Bucket and towels",
-                    "Putty knife"
-                ],
-                "steps": [
-                    "Clear area under sink and place bucket to catch water",
-                    "Shut off water supply valves",
-                    "Disconnect supply lines from old faucet",
-                    "Remove old faucet mounting nuts",
-                    "Clean sink surface where old faucet was mounted",
-                    "Follow manufacturer instructions to assemble new faucet",
-                    "Apply plumber's putty or silicone to base of new faucet",
-                    "Install new faucet from above",
-                    "Secure with mounting hardware from below",
-                    "Connect water supply lines",
-                    "Turn on water and check for leaks"
-                ],
-                "image_url": "/static/diy/kitchen_faucet.jpg",
-                "tips": [
-                    "Take photos before disconnecting old faucet",
-                    "Measure sink holes before purchasing new faucet",
-                    "Consider a pull-down sprayer for added functionality",
-                    "Replace supply lines while you're at it, even if not required"
-                ],
-                "safety": [
-                    "Turn off water at shut-off valves AND verify",
-                    "Keep a bucket and towels handy for water in lines",
-                    "Have a second person help if working in tight spaces"
-                ]
-            }
-        ]
\ No newline at end of file
+        # For now, return the sample set of projects
+        return _load_projects_catalog()
@@ -13,12 +13,24 @@ import json
 import time
 import math
 import logging
+import hashlib
+import functools
+import threading
 import psycopg2
 from openai import OpenAI
-from psycopg2.extras import RealDictCursor
-from flask import Blueprint, request, jsonify, render_template
+from psycopg2.extras import RealDictCursor, execute_values, register_default_jsonb
+from cachetools import LFUCache
+from flask import Blueprint, request, jsonify, render_template, g, has_request_context, make_response, current_app
+from flask import Response, stream_with_context
 from datetime import datetime
 
+from glassrain_production.db_pool import get_connection, return_connection
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Initialize OpenAI client
 # Initialize OpenAI client properly without proxies
 try:
@@ -40,15 +52,163 @@ logger = logging.getLogger('elevate_routes')
 
 elevate_bp = Blueprint('elevate', __name__)
 
+# Design assistant reply without an OpenAI API key
+AI_RESPONSE_NO_KEY_MESSAGE = "I'm unable to process your design request at the moment. The design assistant requires an API key to function properly."
+
+# Design assistant reply when the OpenAI request fails
+AI_RESPONSE_ERROR_MESSAGE = "I apologize, but I encountered an issue processing your design request. Please try again or ask a different question about your room design."
+
 def get_db_connection():
-    """Get a connection to the PostgreSQL database"""
-    try:
-        conn = psycopg2.connect(os.environ.get('DATABASE_URL', ''))
-        conn.autocommit = True
-        return conn
-    except Exception as e:
-        logger.error(f"Database connection error: {str(e)}")
+    """
+    Get a pooled connection to the PostgreSQL database
+    
+    Connections come from the app's shared pool (glassrain_production.db_pool),
+    so this module doesn't hold a second set of connections per worker.
+    Inside a request the connection is borrowed for the rest of the request
+    and handed back by release_request_connection; elsewhere the caller
+    hands it back with release_db_connection.
+    """
+    if has_request_context() and getattr(g, '_elevate_db_conn', None) is not None:
+        return g._elevate_db_conn
+    
+    conn = get_connection()
+    if conn is None:
+        return None
+    
+    if has_request_context():
+        g._elevate_db_conn = conn
+    return conn
+
+def release_db_connection(conn):
+    """Return a connection to the pool, rolling back any open transaction"""
+    return_connection(conn)
+
+@elevate_bp.teardown_request
+def release_request_connection(exc):
+    """Return the request's database connection to the pool, even on errors"""
+    release_db_connection(g.pop('_elevate_db_conn', None))
+
+# Cached GET responses, evicting the least frequently used entries. An
+# entry is only served while fresh; entries are never expired outright.
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('ELEVATE_CACHE_MAX', '1024'))
+
+# Freshness per caching policy: the time the response took to build plus
+# RESPONSE_CACHE_BUFFER seconds, clamped to the policy's (min, max) seconds
+RESPONSE_CACHE_POLICIES = {
+    'short': (1, 10),
+    'normal': (10, 30)
+}
+RESPONSE_CACHE_BUFFER = 5
+
+# Serve the last cached response, marked with 'X-Cache: stale', instead of
+# an error when the database or OpenAI fails
+ELEVATE_CACHE_FALLBACK = os.environ.get('ELEVATE_CACHE_FALLBACK', '').lower() in ('1', 'true', 'yes')
+
+_response_cache = LFUCache(maxsize=RESPONSE_CACHE_MAX_ENTRIES)
+_response_cache_lock = threading.Lock()
+
+def _dumps(obj):
+    """Serialize to a JSON string, with orjson when it is available"""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(obj)
+
+def current_user_id():
+    """Get the current user's ID"""
+    # Get user ID from session (in production)
+    # user_id = session.get('user_id')
+    # For demo, we'll use a fixed user ID
+    return 1
+
+def _response_cache_key(endpoint, user_id):
+    """Cache key for an endpoint's response to a user"""
+    return f"elevate:{endpoint}:{user_id}"
+
+def _cached_entry_response(entry, stale=False):
+    """Build a response from the stored bytes of a cache entry"""
+    response = current_app.response_class(entry['body'], status=entry['status'], content_type=entry['content_type'])
+    if stale:
+        response.headers['X-Cache'] = 'stale'
+    return response
+
+def _cache_response(key, response, freshness=0):
+    """Store a response's bytes, fresh for the given number of seconds"""
+    generated_at = time.time()
+    with _response_cache_lock:
+        _response_cache[key] = {
+            'body': response.get_data(),
+            'status': response.status_code,
+            'content_type': response.content_type,
+            'generated_at': generated_at,
+            'stale_at': generated_at + freshness
+        }
+
+def _stale_response(key):
+    """The last cached response for a key, if falling back to it is enabled"""
+    if not ELEVATE_CACHE_FALLBACK:
         return None
+    
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+    if entry is None:
+        return None
+    
+    logger.warning(f"Serving stale cached response for {key}")
+    return _cached_entry_response(entry, stale=True)
+
+def cached_response(policy='normal'):
+    """
+    Decorator caching a GET endpoint's successful responses per user
+    
+    With ELEVATE_CACHE_FALLBACK set, a failing request (5xx or an
+    exception) is answered with the last cached response instead.
+    
+    Args:
+        policy: Key of RESPONSE_CACHE_POLICIES giving how long responses stay fresh
+        
+    Returns:
+        Decorated function
+    """
+    min_fresh, max_fresh = RESPONSE_CACHE_POLICIES[policy]
+    
+    def decorator(f):
+        @functools.wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = _response_cache_key(request.endpoint, current_user_id())
+            
+            with _response_cache_lock:
+                entry = _response_cache.get(key)
+            if entry is not None and entry['stale_at'] > time.time():
+                return _cached_entry_response(entry)
+            
+            started = time.time()
+            try:
+                response = make_response(f(*args, **kwargs))
+            except Exception:
+                stale = _stale_response(key)
+                if stale is None:
+                    raise
+                return stale
+            
+            if response.status_code >= 500:
+                return _stale_response(key) or response
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            
+            freshness = min(max(time.time() - started + RESPONSE_CACHE_BUFFER, min_fresh), max_fresh)
+            _cache_response(key, response, freshness)
+            return response
+        
+        return decorated_function
+    
+    return decorator
+
+def invalidate_cached_responses(*endpoints):
+    """Drop the current user's cached responses for the given endpoints"""
+    user_id = current_user_id()
+    with _response_cache_lock:
+        for endpoint in endpoints:
+            _response_cache.pop(_response_cache_key(endpoint, user_id), None)
 
 @elevate_bp.route('/elevate')
 def elevate_page():
@@ -57,6 +217,7 @@ def elevate_page():
     return render_template('elevate.html', address_id=address_id)
 
 @elevate_bp.route('/api/rooms', methods=['GET'])
+@cached_response()
 def get_rooms():
     """Get all scanned rooms for the current user"""
     conn = get_db_connection()
@@ -64,10 +225,7 @@ def get_rooms():
         return jsonify({"error": "Database connection failed"}), 500
     
     try:
-        # Get user ID from session (in production)
-        # user_id = session.get('user_id')
-        # For demo, we'll use a fixed user ID
-        user_id = 1
+        user_id = current_user_id()
         
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         cursor.execute("""
@@ -80,7 +238,6 @@ def get_rooms():
         
         rooms = cursor.fetchall()
         cursor.close()
-        conn.close()
         
         return jsonify({"rooms": rooms})
     except Exception as e:
@@ -98,13 +255,13 @@ def create_room():
         return jsonify({"error": "No data provided"}), 400
     
     try:
-        # Get user ID from session (in production)
-        # user_id = session.get('user_id')
-        # For demo, we'll use a fixed user ID
-        user_id = 1
+        user_id = current_user_id()
         
         room_data = request.json
         
+        # The room and its measurements are committed together
+        conn.autocommit = False
+        
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         cursor.execute("""
             INSERT INTO scanned_rooms (
@@ -134,26 +291,34 @@ def create_room():
             raise Exception("Failed to insert room record")
         room_id = result['id']
         
-        # Save measurements to measurements table if provided
-        if 'measurements' in room_data:
-            for measurement in room_data['measurements']:
-                cursor.execute("""
-                    INSERT INTO room_measurements (
-                        room_id, measurement_type, value, unit
-                    ) VALUES (%s, %s, %s, %s)
-                """, (
+        # Save measurements to measurements table if provided, in a single
+        # round trip
+        if room_data.get('measurements'):
+            rows = [
+                (
                     room_id,
                     measurement.get('type', ''),
                     measurement.get('value', 0),
                     measurement.get('unit', '')
-                ))
+                )
+                for measurement in room_data['measurements']
+            ]
+            
+            execute_values(cursor, """
+                INSERT INTO room_measurements (
+                    room_id, measurement_type, value, unit
+                ) VALUES %s
+            """, rows, page_size=200)
         
+        conn.commit()
         cursor.close()
-        conn.close()
+        
+        invalidate_cached_responses('elevate.get_rooms')
         
         return jsonify({"id": room_id, "message": "Room created successfully"})
     except Exception as e:
         logger.error(f"Error creating room: {str(e)}")
+        # release_request_connection rolls the transaction back
         return jsonify({"error": str(e)}), 500
 
 @elevate_bp.route('/api/rooms/<int:room_id>', methods=['DELETE'])
@@ -164,10 +329,7 @@ def delete_room(room_id):
         return jsonify({"error": "Database connection failed"}), 500
     
     try:
-        # Get user ID from session (in production)
-        # user_id = session.get('user_id')
-        # For demo, we'll use a fixed user ID
-        user_id = 1
+        user_id = current_user_id()
         
         cursor = conn.cursor()
         
@@ -179,7 +341,6 @@ def delete_room(room_id):
         
         if cursor.fetchone() is None:
             cursor.close()
-            conn.close()
             return jsonify({"error": "Room not found or access denied"}), 404
         
         # Delete from room_measurements
@@ -201,7 +362,9 @@ def delete_room(room_id):
         """, (room_id,))
         
         cursor.close()
-        conn.close()
+        
+        # Deleting a room deletes its designs too
+        invalidate_cached_responses('elevate.get_rooms', 'elevate.get_designs')
         
         return jsonify({"message": "Room deleted successfully"})
     except Exception as e:
@@ -209,6 +372,7 @@ def delete_room(room_id):
         return jsonify({"error": str(e)}), 500
 
 @elevate_bp.route('/api/designs', methods=['GET'])
+@cached_response()
 def get_designs():
     """Get all saved designs for the current user"""
     conn = get_db_connection()
@@ -216,15 +380,19 @@ def get_designs():
         return jsonify({"error": "Database connection failed"}), 500
     
     try:
-        # Get user ID from session (in production)
-        # user_id = session.get('user_id')
-        # For demo, we'll use a fixed user ID
-        user_id = 1
+        user_id = current_user_id()
         
         cursor = conn.cursor(cursor_factory=RealDictCursor)
+        if orjson:
+            register_default_jsonb(conn_or_curs=cursor, loads=orjson.loads)
+        
+        # Tags that aren't a JSON array (missing or malformed) come back as
+        # an empty list. Legacy string-encoded tags are decoded by
+        # setup_elevate_database.
         cursor.execute("""
             SELECT d.id, d.name, d.description, d.room_id, r.room_type,
-                   d.created_at, d.thumbnail_url, d.tags
+                   d.created_at, d.thumbnail_url,
+                   CASE WHEN jsonb_typeof(d.tags) = 'array' THEN d.tags ELSE '[]'::jsonb END AS tags
             FROM room_designs d
             JOIN scanned_rooms r ON d.room_id = r.id
             WHERE d.user_id = %s
@@ -233,16 +401,7 @@ def get_designs():
         
         designs = cursor.fetchall()
         
-        # Convert tags to array if stored as string
-        for design in designs:
-            if isinstance(design['tags'], str):
-                try:
-                    design['tags'] = json.loads(design['tags'])
-                except:
-                    design['tags'] = []
-        
         cursor.close()
-        conn.close()
         
         return jsonify({"designs": designs})
     except Exception as e:
@@ -260,10 +419,7 @@ def create_design():
         return jsonify({"error": "No data provided"}), 400
     
     try:
-        # Get user ID from session (in production)
-        # user_id = session.get('user_id')
-        # For demo, we'll use a fixed user ID
-        user_id = 1
+        user_id = current_user_id()
         
         design_data = request.json
         
@@ -280,29 +436,28 @@ def create_design():
         
         if cursor.fetchone() is None:
             cursor.close()
-            conn.close()
             return jsonify({"error": "Room not found or access denied"}), 404
         
         # Prepare tags field
         tags = design_data.get('tags', [])
         if isinstance(tags, list):
-            tags_json = json.dumps(tags)
+            tags_json = _dumps(tags)
         else:
-            tags_json = json.dumps([])
+            tags_json = _dumps([])
         
         # Store chat history if provided
         chat_history = design_data.get('chat_history', [])
         if isinstance(chat_history, list):
-            chat_history_json = json.dumps(chat_history)
+            chat_history_json = _dumps(chat_history)
         else:
-            chat_history_json = json.dumps([])
+            chat_history_json = _dumps([])
         
         # Store measurements if provided
         measurements = design_data.get('measurements', {})
         if isinstance(measurements, dict):
-            measurements_json = json.dumps(measurements)
+            measurements_json = _dumps(measurements)
         else:
-            measurements_json = json.dumps({})
+            measurements_json = _dumps({})
         
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         cursor.execute("""
@@ -328,7 +483,8 @@ def create_design():
             raise Exception("Failed to insert design record")
         design_id = result['id']
         cursor.close()
-        conn.close()
+        
+        invalidate_cached_responses('elevate.get_designs')
         
         return jsonify({"id": design_id, "message": "Design saved successfully"})
     except Exception as e:
@@ -343,10 +499,7 @@ def delete_design(design_id):
         return jsonify({"error": "Database connection failed"}), 500
     
     try:
-        # Get user ID from session (in production)
-        # user_id = session.get('user_id')
-        # For demo, we'll use a fixed user ID
-        user_id = 1
+        user_id = current_user_id()
         
         cursor = conn.cursor()
         
@@ -358,7 +511,6 @@ def delete_design(design_id):
         
         if cursor.fetchone() is None:
             cursor.close()
-            conn.close()
             return jsonify({"error": "Design not found or access denied"}), 404
         
         # Delete design
@@ -368,7 +520,8 @@ def delete_design(design_id):
         """, (design_id,))
         
         cursor.close()
-        conn.close()
+        
+        invalidate_cached_responses('elevate.get_designs')
         
         return jsonify({"message": "Design deleted successfully"})
     except Exception as e:
@@ -397,26 +550,89 @@ def design_assistant():
         # Get chat history if provided
         chat_history = message_data.get('chat_history', [])
         
-        # In a real implementation, this would call the OpenAI API
-        # For demo, we'll simulate responses based on keywords
-        
-        # Simulate processing time
-        time.sleep(1)
-        
-        # Generate a response based on the user message
-        response = generate_ai_response(user_message, room_data, chat_history)
-        
-        return jsonify({
+        # Clients asking for an event stream get the response as it is
+        # generated
+        if message_data.get('stream') or request.accept_mimetypes.best == 'text/event-stream':
+            def events():
+                for delta in stream_ai_response(user_message, room_data, chat_history):
+                    yield f"data: {_dumps({'delta': delta})}\n\n"
+                yield f"data: {_dumps({'done': True, 'room_updates': {}})}\n\n"
+            
+            return Response(stream_with_context(events()), mimetype='text/event-stream')
+        
+        # Generate a response based on the user message. With the cache
+        # fallback, a failed request is answered with the last response to
+        # the same message about the same room.
+        fallback_key = _assistant_cache_key(user_message, room_data)
+        try:
+            response = generate_ai_response(user_message, room_data, chat_history, raise_errors=ELEVATE_CACHE_FALLBACK)
+        except Exception:
+            # Already logged by generate_ai_response
+            stale = _stale_response(fallback_key)
+            if stale is not None:
+                return stale
+            response = AI_RESPONSE_ERROR_MESSAGE
+        
+        result = jsonify({
             "response": response,
             "room_updates": {}  # In a real implementation, this would contain updates to apply to the room
         })
+        if ELEVATE_CACHE_FALLBACK and response != AI_RESPONSE_ERROR_MESSAGE:
+            _cache_response(fallback_key, result)
+        return result
     except Exception as e:
         logger.error(f"Error processing design assistant request: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-def generate_ai_response(message, room, chat_history):
+def _assistant_cache_key(message, room):
+    """Cache key for a design assistant response"""
+    digest = hashlib.sha256(json.dumps([message, room], sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f"elevate:design_assistant:{digest}"
+
+def _build_ai_messages(message, room, chat_history):
+    """Build the OpenAI chat messages for a design assistant request"""
+    # Get room measurements for context
+    width = room.get('width', 12)
+    length = room.get('length', 14)
+    height = room.get('height', 8)
+    area = room.get('area', width * length)
+    room_type = room.get('room_type', 'living room')
+    
+    # Create a formatted room data message
+    room_context = f"""Room information:
+        - Type: {room_type}
+        - Dimensions: {width}' x {length}' (area: {area} sq ft)
+        - Ceiling height: {height}'
+        - Current features: {', '.join(room.get('features', ['standard walls', 'basic flooring']))}
+        """
+    
+    # Format the chat history
+    formatted_history = []
+    for chat in chat_history:
+        role = "assistant" if chat.get('is_ai', False) else "user"
+        formatted_history.append({"role": role, "content": chat.get('message', '')})
+    
+    # Prepare the messages for the API call
+    messages = [
+        {"role": "system", "content": "You are an expert interior designer and renovation specialist. Provide detailed, practical advice for home improvement projects. Include cost estimates when appropriate and suggest specific materials, colors, or products. Format suggestions with [suggestion: text] so the interface can display them as clickable options."},
+        {"role": "system", "content": room_context}
+    ]
+    
+    # Add chat history if available
+    if formatted_history:
+        messages.extend(formatted_history)
+    
+    # Add the current user message
+    messages.append({"role": "user", "content": message})
+    
+    return messages
+
+def generate_ai_response(message, room, chat_history, raise_errors=False):
     """
     Generate AI response based on user message using OpenAI API
+    
+    API errors are answered with AI_RESPONSE_ERROR_MESSAGE, or raised if
+    raise_errors is set.
     """
     import os
     import openai
@@ -426,42 +642,10 @@ def generate_ai_response(message, room, chat_history):
     api_key = os.environ.get('OPENAI_API_KEY')
     if not api_key:
         logger.error("OpenAI API key not available")
-        return "I'm unable to process your design request at the moment. The design assistant requires an API key to function properly."
+        return AI_RESPONSE_NO_KEY_MESSAGE
     
     try:
-        # Get room measurements for context
-        width = room.get('width', 12)
-        length = room.get('length', 14)
-        height = room.get('height', 8)
-        area = room.get('area', width * length)
-        room_type = room.get('room_type', 'living room')
-        
-        # Create a formatted room data message
-        room_context = f"""Room information:
-        - Type: {room_type}
-        - Dimensions: {width}' x {length}' (area: {area} sq ft)
-        - Ceiling height: {height}'
-        - Current features: {', '.join(room.get('features', ['standard walls', 'basic flooring']))}
-        """
-        
-        # Format the chat history
-        formatted_history = []
-        for chat in chat_history:
-            role = "assistant" if chat.get('is_ai', False) else "user"
-            formatted_history.append({"role": role, "content": chat.get('message', '')})
-        
-        # Prepare the messages for the API call
-        messages = [
-            {"role": "system", "content": "You are an expert interior designer and renovation specialist. Provide detailed, practical advice for home improvement projects. Include cost estimates when appropriate and suggest specific materials, colors, or products. Format suggestions with [suggestion: text] so the interface can display them as clickable options."},
-            {"role": "system", "content": room_context}
-        ]
-        
-        # Add chat history if available
-        if formatted_history:
-            messages.extend(formatted_history)
-        
-        # Add the current user message
-        messages.append({"role": "user", "content": message})
+        messages = _build_ai_messages(message, room, chat_history)
         
         # Make the API call
         response = openai_client.chat.completions.create(
@@ -476,7 +660,45 @@ def generate_ai_response(message, room, chat_history):
         
     except Exception as e:
         logger.error(f"Error generating AI response: {str(e)}")
-        return "I apologize, but I encountered an issue processing your design request. Please try again or ask a different question about your room design."
+        if raise_errors:
+            raise
+        return AI_RESPONSE_ERROR_MESSAGE
+
+def stream_ai_response(message, room, chat_history):
+    """
+    Generate AI response based on user message using OpenAI API, streamed
+    
+    Yields the response in pieces as they arrive from the API. Without an
+    API key, or if the request fails before anything was received, the
+    usual replies for those cases are yielded instead.
+    """
+    if not os.environ.get('OPENAI_API_KEY'):
+        logger.error("OpenAI API key not available")
+        yield AI_RESPONSE_NO_KEY_MESSAGE
+        return
+    
+    started = False
+    try:
+        stream = openai_client.chat.completions.create(
+            model="gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May, 2024
+            messages=_build_ai_messages(message, room, chat_history),
+            temperature=0.7,
+            max_tokens=800,
+            stream=True
+        )
+        
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                started = True
+                yield delta
+                
+    except Exception as e:
+        logger.error(f"Error streaming AI response: {str(e)}")
+        if not started:
+            yield AI_RESPONSE_ERROR_MESSAGE
 
 def init_elevate_routes(app):
     """Initialize Elevate routes with the Flask app"""
@@ -543,10 +765,33 @@ def setup_elevate_database():
             )
         """)
         
+        # Older rows stored tags as a JSON-encoded string inside the JSONB
+        # column; decode them in place so get_designs can read tags as an
+        # array. Text that isn't valid JSON becomes an empty list.
+        cursor.execute("""
+            DO $$
+            DECLARE
+                design record;
+            BEGIN
+                FOR design IN
+                    SELECT id, tags #>> '{}' AS tags_text
+                    FROM room_designs
+                    WHERE jsonb_typeof(tags) = 'string'
+                LOOP
+                    BEGIN
+                        UPDATE room_designs SET tags = design.tags_text::jsonb WHERE id = design.id;
+                    EXCEPTION WHEN data_exception THEN
+                        UPDATE room_designs SET tags = '[]'::jsonb WHERE id = design.id;
+                    END;
+                END LOOP;
+            END $$
+        """)
+        
         conn.commit()
         cursor.close()
-        conn.close()
         
         logger.info("Elevate database tables created successfully")
     except Exception as e:
-        logger.error(f"Error setting up Elevate database tables: {str(e)}")
\ No newline at end of file
+        logger.error(f"Error setting up Elevate database tables: {str(e)}")
+    finally:
+        release_db_connection(conn)
\ No newline at end of file
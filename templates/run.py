@@ -18,6 +18,11 @@ from psycopg2.extras import RealDictCursor
 import psycopg2.extras
 import store_products
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Import configuration
 try:
     from config import MAPBOX_API_KEY, AWS_ACCESS_KEY, AWS_SECRET_KEY, AWS_REGION
@@ -1078,6 +1083,20 @@ def diy_projects():
         # Check if the diy_assistant is available
         if hasattr(diy_assistant, 'get_projects'):
             projects = diy_assistant.get_projects(project_type, difficulty)
+            if orjson:
+                # The project dicts hold many small strings; orjson encodes
+                # them several times faster than Flask's JSON provider. Keys
+                # are sorted and other types go through the provider's
+                # default(), so the output matches jsonify's.
+                try:
+                    body = orjson.dumps(
+                        {"projects": projects},
+                        default=app.json.default,
+                        option=orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+                    )
+                    return app.response_class(body, mimetype='application/json')
+                except TypeError:
+                    pass
             return jsonify({"projects": projects})
         else:
             # Simplified response for demo